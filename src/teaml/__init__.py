@@ -1,10 +1,10 @@
 from teaml.teaml import Teaml
 
-def load(filename):
-    return Teaml.load(filename)
+def load(filename, cache=None, validate=False):
+    return Teaml.load(filename, cache=cache, validate=validate)
 
-def loads(text):
-    return Teaml.loads(text)
+def loads(text, validate=False):
+    return Teaml.loads(text, validate=validate)
 
 def sample(name):
     return Teaml.sample(name)
@@ -0,0 +1,122 @@
+"""
+Timing Teaml operations on synthetic models
+
+    python -m teaml.benchmark --nodes 1000 --vector-length 25 --output bench.json
+
+Writes JSON with the model parameters and, per operation, the seconds of
+each run along with their minimum and median.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+from time import perf_counter
+
+import yaml
+
+from teaml.cache import teaml_version
+from teaml.synthetic import generate
+
+def timed(fn, setup=None, repeat=5):
+    """
+    Seconds for each of `repeat` calls of fn(setup()), setup isn't timed
+    """
+    runs = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = perf_counter()
+        fn(state)
+        runs.append(perf_counter() - start)
+    return {'min': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+def run(nodes=1000, depth=3, collisions=0.1, vector_length=0, fan_in=2, seed=0, repeat=5, lookups=100):
+    """
+    Times each operation on one generated model
+
+    Returns:
+        dict: 'params', 'environment' and 'results' as {operation: timing}
+    """
+    from teaml.teaml import Teaml
+    params = {
+        'nodes': nodes, 'depth': depth, 'collisions': collisions,
+        'vector_length': vector_length, 'fan_in': fan_in, 'seed': seed,
+        'repeat': repeat, 'lookups': lookups,
+    }
+    text = yaml.dump(generate(nodes=nodes, depth=depth, collisions=collisions,
+        vector_length=vector_length, fan_in=fan_in, seed=seed))
+
+    computed = Teaml.loads(text)
+    computed.compute()
+    formulas = list(computed.graph.formulas)
+    # Reference names as the model uses them, a unique name or a full path
+    keys = ['.'.join(path) for path in formulas[::max(1, len(formulas) // lookups)]]
+    last = '.'.join(formulas[-1])
+
+    def fresh():
+        return Teaml.loads(text)
+
+    def fresh_computed():
+        # Not a copy: copies share the graph and so its memoized traces
+        tea = Teaml.loads(text)
+        tea.compute()
+        return tea
+
+    def indexed():
+        tea = Teaml.loads(text)
+        tea.index
+        return tea
+
+    def find(tea):
+        for key in keys:
+            tea.find(key)
+
+    results = {
+        'loads': timed(lambda _: Teaml.loads(text), repeat=repeat),
+        'find': timed(find, indexed, repeat=repeat),
+        'compute': timed(lambda tea: tea.compute(), fresh, repeat=repeat),
+        'compute_key': timed(lambda tea: tea.compute(last), fresh, repeat=repeat),
+        'recompute_key': timed(lambda tea: tea.compute(last), lambda: computed.copy(), repeat=repeat),
+        'trace': timed(lambda tea: tea.trace(last), fresh_computed, repeat=repeat),
+        'copy': timed(lambda _: computed.copy(), repeat=repeat),
+        'reset': timed(lambda _: computed.reset(), repeat=repeat),
+        'dumps': timed(lambda tea: tea.dumps(), lambda: computed.copy(), repeat=repeat),
+    }
+    return {
+        'params': params,
+        'environment': {
+            'teaml': teaml_version(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'formulas': len(formulas),
+        'results': results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m teaml.benchmark',
+        description='Time Teaml operations on a synthetic model and print JSON')
+    parser.add_argument('--nodes', type=int, default=1000, help='values and formulas in the model')
+    parser.add_argument('--depth', type=int, default=3, help='levels of nested groups')
+    parser.add_argument('--collisions', type=float, default=0.1, help='share of nodes reusing a name')
+    parser.add_argument('--vector-length', type=int, default=0, help='length of input lists, 0 for numbers')
+    parser.add_argument('--fan-in', type=int, default=2, help='references per formula')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per operation')
+    parser.add_argument('--lookups', type=int, default=100, help='names resolved by the find operation')
+    parser.add_argument('--output', default='-', help='JSON file to write, default stdout')
+    args = parser.parse_args(argv)
+
+    report = run(nodes=args.nodes, depth=args.depth, collisions=args.collisions,
+        vector_length=args.vector_length, fan_in=args.fan_in, seed=args.seed, repeat=args.repeat,
+        lookups=args.lookups)
+    text = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+if __name__ == '__main__':
+    main()
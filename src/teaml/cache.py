@@ -0,0 +1,284 @@
+"""
+On-disk caches of parsed models and computed results
+
+Loading a model from a ModelCache skips YAML parsing, building the name
+index and dependency graph, and parsing and compiling its formulas. A
+ResultCache skips computing formulas whose inputs are unchanged since an
+earlier run.
+"""
+
+import hashlib
+import os
+import pickle
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Bump when the pickled layout or any cached class changes
+FORMAT = 2
+
+def teaml_version():
+    try:
+        from importlib.metadata import version
+        return version('teaml')
+    except Exception:
+        return 'unknown'
+
+class ModelCache:
+    """
+    Parsed models pickled into `directory`
+
+    Entries are keyed by the file's path, modification time and content,
+    along with the Python and teaml versions, so any change to the file or
+    the library is a miss. Stale entries are left in place.
+    """
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def key(self, filename, data:bytes):
+        filename = Path(filename).resolve()
+        digest = hashlib.sha256()
+        for part in (FORMAT, sys.version, teaml_version(), filename, os.stat(filename).st_mtime_ns):
+            digest.update(str(part).encode('utf-8') + b'\0')
+        digest.update(data)
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return self.directory / f'{key}.pickle'
+
+    def load(self, filename, cls=None):
+        """
+        Returns a Teaml for `filename`, from the cache when possible
+        """
+        if cls is None:
+            from teaml.teaml import Teaml as cls
+        with open(filename, 'rb') as f:
+            data = f.read()
+        key = self.key(filename, data)
+        try:
+            with open(self.entry_path(key), 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            entry = None
+        if entry is not None:
+            return self.restore(cls, entry)
+        tea = cls.loads(data.decode('utf-8'), directory=os.path.dirname(filename))
+        self.store(key, tea)
+        return tea
+
+    def restore(self, cls, entry):
+        from teaml.formula.tea_parser import computer
+        tea = cls.wrap(entry['tree'])
+        tea._index = entry['index']
+        tea._graph = entry['graph']
+        computer.preload(entry['formulas'])
+        return tea
+
+    def store(self, key, tea):
+        from teaml.formula.tea_parser import computer
+        from teaml.utils import munge
+        graph = tea.graph
+        entry = {
+            'tree': tea.tree,
+            'index': tea.index,
+            'graph': graph,
+            'formulas': computer.compiled(munge(f) for f in graph.formulas.values()),
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Written aside then renamed, so readers never see a partial entry
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self.entry_path(key))
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+class Uncacheable(Exception):
+    pass
+
+def fingerprint(value, digest):
+    """
+    Adds an exact, type aware encoding of a formula value to `digest`
+
+    Raises:
+        Uncacheable: for values other than numbers, strings, None, ranges
+            and the namedtuples of dotted references
+    """
+    if value is None:
+        digest.update(b'N')
+    elif isinstance(value, bool):
+        digest.update(b'B1' if value else b'B0')
+    elif isinstance(value, int):
+        digest.update(b'I%d;' % value)
+    elif isinstance(value, float):
+        digest.update(b'F' + float.hex(value).encode('ascii') + b';')
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        digest.update(b'S%d;' % len(data) + data)
+    elif numpy is not None and isinstance(value, numpy.ndarray):
+        digest.update(b'A' + value.dtype.str.encode('ascii') + struct.pack('<q', value.size))
+        digest.update(numpy.ascontiguousarray(value).tobytes())
+    elif isinstance(value, tuple) and hasattr(value, '_fields'):
+        digest.update(b'T%d;' % len(value))
+        for field, item in zip(value._fields, value):
+            fingerprint(field, digest)
+            fingerprint(item, digest)
+    elif isinstance(value, (list, tuple)):
+        digest.update(b'L%d;' % len(value))
+        for item in value:
+            fingerprint(item, digest)
+    else:
+        raise Uncacheable(type(value).__name__)
+
+class ResultCache:
+    """
+    Formula results stored in `directory`, shared by runs and processes
+
+    Each result is keyed by a hash of its formula and the values of its
+    references, so a formula whose inputs are unchanged since any earlier
+    run is read back rather than computed. A hit costs a small file read,
+    so it pays off for formulas slower than that, such as irr over long
+    ranges. Entries are written aside and renamed into place, readers never
+    see a partial entry.
+
+    Reading an entry updates its modification time. Once the entries this
+    process knows of pass `max_bytes`, the least recently used are removed
+    down to `max_bytes * LOW_WATER`, under a lock file so one process
+    evicts at a time.
+
+    Args:
+        directory (str): where entries are stored
+        max_bytes (int): size of the entries before evicting
+    """
+    LOW_WATER = 0.8
+
+    def __init__(self, directory, max_bytes=2 ** 30):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.salt = f'{FORMAT}\0{sys.version}\0{teaml_version()}\0'.encode('utf-8')
+        # Bytes of entries, scanned on the first store then counted
+        self.size = None
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, formula, context):
+        """
+        Hex digest for `formula` evaluated in `context`, None if a value
+        can't be hashed
+        """
+        digest = hashlib.sha256(self.salt)
+        fingerprint(formula, digest)
+        try:
+            for name in sorted(context):
+                fingerprint(name, digest)
+                fingerprint(context[name], digest)
+        except Uncacheable:
+            return None
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return self.directory / key[:2] / f'{key}.pickle'
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (True, result) for a hit, (False, None) otherwise
+        """
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Missing, evicted after opening, or from an incompatible version
+            return False, None
+        return True, result
+
+    def put(self, key, result):
+        path = self.entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+                written = f.tell()
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        if self.size is None:
+            self.size = self.scan()[1]
+        else:
+            self.size += written
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def compute(self, formula, context, fn):
+        """
+        The cached result of `formula` in `context`, otherwise fn() stored
+        """
+        key = self.key(formula, context)
+        if key is None:
+            return fn()
+        found, result = self.get(key)
+        if found:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = fn()
+        try:
+            self.put(key, result)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            pass
+        return result
+
+    def scan(self):
+        """
+        Returns:
+            tuple: ([(mtime, size, path)] of the entries, their total size)
+        """
+        entries = []
+        for path in self.directory.glob('*/*.pickle'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def evict(self):
+        """
+        Removes the least recently used entries down to the low water mark
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / '.lock', 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                entries, size = self.scan()
+                target = self.max_bytes * self.LOW_WATER
+                for _, entry_size, path in sorted(entries):
+                    if size <= target:
+                        break
+                    try:
+                        path.unlink()
+                    except OSError:
+                        continue
+                    size -= entry_size
+                self.size = size
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
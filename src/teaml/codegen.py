@@ -0,0 +1,265 @@
+"""
+Compiling a Teaml into a single Python function
+
+References are resolved once with the model's own lookup rules, and each
+formula becomes a statement over local variables, in evaluation order:
+
+    def model(inputs):
+        v0 = value(inputs['capacity']) if 'capacity' in inputs else c0
+        # outputs.total
+        if iserror(v0):
+            v1 = v0
+        else:
+            try:
+                v1 = (v0 * 2)
+            except Exception as e:
+                v1 = error_string(e)
+        ...
+        return {'total': v1}
+
+Formulas the rewrite can't express with locals, such as comprehensions or
+names that aren't bound references, are evaluated with the Computer like
+`Teaml.compute` does.
+"""
+
+import ast
+import builtins
+
+from teaml.container import AmbigousNameError
+from teaml.formula.tea_parser import computer, create_namedtuples, error_string, iserror
+from teaml.formula.vector import vector
+from teaml.node import Node
+from teaml.utils import munge
+
+# Nodes that introduce their own names
+SCOPES = (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp, ast.NamedExpr)
+
+def value(raw):
+    """
+    The value a formula sees for `raw`, as stored in a model
+    """
+    result = Node.new(raw).value
+    if isinstance(result, list):
+        result = vector(result)
+    return result
+
+def evaluate(formula, context, computer=computer):
+    """
+    Evaluates `formula` the way `Teaml.evaluate_path` does
+    """
+    for name, v in context.items():
+        if isinstance(v, list):
+            context[name] = vector(v)
+    context = create_namedtuples(context)
+    errors = [v for v in context.values() if iserror(v)]
+    if errors:
+        return errors[0]
+    result = computer.compute(formula, context)
+    if type(result) is list:
+        result = vector(result)
+    return result
+
+def dotted(node):
+    """
+    'a.b.c' for a chain of attributes on a name, otherwise None
+    """
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+def rewrite(formula, locals):
+    """
+    `formula` with each reference replaced by its local variable
+
+    Args:
+        formula (str): munged formula source
+        locals (dict): reference name -> local variable name
+
+    Returns:
+        str: the rewritten expression, or None when it needs `evaluate`
+    """
+    if '\n' in formula:
+        return None
+    try:
+        tree = ast.parse(formula, mode='eval')
+    except SyntaxError:
+        return None
+    spans = []
+    pending = [tree.body]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, SCOPES):
+            return None
+        if isinstance(node, (ast.Name, ast.Attribute)):
+            name = dotted(node)
+            if name in locals:
+                spans.append((node.col_offset, node.end_col_offset, locals[name]))
+                continue
+            if isinstance(node, ast.Name):
+                # `eval` is the Computer's own in a formula
+                if node.id == 'eval':
+                    return None
+                if node.id not in computer.sandbox and not hasattr(builtins, node.id):
+                    return None
+        pending.extend(ast.iter_child_nodes(node))
+    # Offsets are in utf-8 bytes
+    source = formula.encode('utf-8')
+    for start, end, local in sorted(spans, reverse=True):
+        source = source[:start] + local.encode('utf-8') + source[end:]
+    return source.decode('utf-8')
+
+class CompiledModel:
+    """
+    A Teaml compiled into one function of its inputs
+
+    Calling it with {input: raw value} returns {output: value}. Inputs not
+    given keep the model's values. Compiled models pickle as their source.
+
+    Attributes:
+        source (str): the generated Python code
+        inputs (list): names that can be overridden
+        outputs (list): names that are returned
+    """
+    def __init__(self, source, constants, inputs, outputs):
+        self.source = source
+        self.constants = constants
+        self.inputs = inputs
+        self.outputs = outputs
+        self.function = self._build()
+
+    def _build(self):
+        namespace = {
+            'computer': computer,
+            'error_string': error_string,
+            'evaluate': evaluate,
+            'iserror': iserror,
+            'value': value,
+            'vector': vector,
+        }
+        namespace.update(computer.sandbox)
+        namespace.update(self.constants)
+        exec(compile(self.source, '<teaml>', 'exec'), namespace)
+        return namespace['model']
+
+    def __call__(self, inputs=None):
+        inputs = inputs or {}
+        unknown = [name for name in inputs if name not in self.inputs]
+        if unknown:
+            raise KeyError(f"Not compiled as inputs: {', '.join(unknown)}")
+        return self.function(inputs)
+
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items() if k != 'function'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.function = self._build()
+
+def compile_model(tea, inputs=(), outputs=None):
+    """
+    Generates a CompiledModel for `tea`
+
+    Args:
+        tea (Teaml): the model
+        inputs (list): names that can be overridden on each call
+        outputs (list): names to return, defaults to every formula
+
+    Returns:
+        CompiledModel
+    """
+    graph = tea.graph
+    inputs = list(inputs)
+    input_paths = {tuple(tea.find_container(name).path): name for name in inputs}
+    if outputs is None:
+        outputs = [munge(list(path)) for path in graph.formulas]
+        output_paths = list(graph.formulas)
+    else:
+        outputs = list(outputs)
+        output_paths = [tuple(tea.find_container(name).path) for name in outputs]
+    schedule = graph.schedule(output_paths)
+
+    constants = {}
+    locals = {}
+    lines = ['def model(inputs):']
+
+    def local(path):
+        if path in locals:
+            return locals[path]
+        name = locals[path] = f'v{len(locals)}'
+        if path in input_paths:
+            key = input_paths[path]
+            if path in graph:
+                default = tea.copy().compute(key)
+                default = vector(default) if isinstance(default, list) else default
+            else:
+                default = value(tea.raw_at(path))
+            constants[f'c{len(constants)}'] = default
+            lines.append(f"    {name} = value(inputs[{key!r}]) if {key!r} in inputs else c{len(constants) - 1}")
+        elif path not in graph:
+            constants[f'c{len(constants)}'] = value(tea.raw_at(path))
+            lines.append(f"    {name} = c{len(constants) - 1}")
+        return name
+
+    for path in input_paths:
+        local(path)
+    for cycle in schedule.cycles:
+        error = f"#error(cycle {','.join(munge(list(path)) for path in cycle)})"
+        for path in cycle:
+            if path not in input_paths:
+                lines.append(f"    {local(path)} = {error!r}")
+
+    for path in schedule.order:
+        if path in input_paths:
+            continue
+        bindings = graph.bindings[path]
+        refs = {}
+        for ref_name, ref in bindings.items():
+            if isinstance(ref, KeyError):
+                refs[ref_name] = repr(f'#error(Key:{ref_name})')
+            elif isinstance(ref, AmbigousNameError):
+                refs[ref_name] = repr(f'#error(Ambigous:{ref})')
+            else:
+                refs[ref_name] = local(ref)
+        target = local(path)
+        formula = munge(graph.formulas[path])
+        lines.append(f"    # {munge(list(path))}")
+        aliases = {}
+        for ref_name, ref in refs.items():
+            if ref.startswith('v'):
+                aliases[ref_name] = ref
+            else:
+                # Errors get a local of their own, formulas may use them
+                aliases[ref_name] = f'{target}_e{len(aliases)}'
+                lines.append(f"    {aliases[ref_name]} = {ref}")
+        expression = rewrite(formula, aliases)
+        if expression is None:
+            context = ', '.join(f'{k!r}: {v}' for k, v in aliases.items())
+            lines.append(f"    {target} = evaluate({formula!r}, {{{context}}})")
+            continue
+        # Dotted references are fields of a namedtuple in `compute`, so only
+        # plain names short circuit on errors
+        checks = [alias for ref_name, alias in aliases.items() if '.' not in ref_name]
+        indent = '    '
+        if checks:
+            for i, alias in enumerate(checks):
+                lines.append(f"    {'if' if i == 0 else 'elif'} iserror({alias}):")
+                lines.append(f"        {target} = {alias}")
+            lines.append("    else:")
+            indent = '        '
+        lines.append(f"{indent}try:")
+        lines.append(f"{indent}    {target} = ({expression})")
+        lines.append(f"{indent}except Exception as e:")
+        lines.append(f"{indent}    {target} = error_string(e)")
+        lines.append(f"{indent}if type({target}) is list:")
+        lines.append(f"{indent}    {target} = vector({target})")
+
+    for path in output_paths:
+        local(path)
+    returned = ', '.join(f'{name!r}: {local(path)}' for name, path in zip(outputs, output_paths))
+    lines.append(f"    return {{{returned}}}")
+    return CompiledModel('\n'.join(lines) + '\n', constants, inputs, outputs)
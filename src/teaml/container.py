@@ -2,25 +2,36 @@
 Container utilities for nested dictionaries
 """
 
+from bisect import bisect_left
 from collections import namedtuple
+from functools import cached_property
 
 from teaml.utils import munge
 
+ContainerResult = namedtuple('Result', ['container', 'key', 'value', 'path'])
+WalkResult = namedtuple('Result', ['container', 'key', 'path', 'matches'])
+
 class AmbigousNameError(ValueError):
     def __init__(self, search, paths):
+        self.search = search
+        self.paths = paths
         paths = ', '.join(['.'.join(p) for p in paths])
         super().__init__(f"{search} matches {paths}")
 
+    def __reduce__(self):
+        return (AmbigousNameError, (self.search, self.paths))
+
 def child_dicts(parent:dict):
     return [(k,v) for (k,v) in parent.items() if isinstance(v, dict)]
 
-def find_container(node:dict, search:str):
+def find_container(node:dict, search:str, index:'NameIndex'=None):
     """
     Find the best match for a search pattern
 
     Args:
         node (dict): a nested dictionary
         search (str): a search pattern
+        index (NameIndex): optional prebuilt index of `node`
 
     Search can be separated by periods to indicate nested keys, and nesting may jump levels.
 
@@ -30,7 +41,11 @@ def find_container(node:dict, search:str):
     Raises:
         ValueError: if no, or multiple matches are found
     """
-    Result = namedtuple('Result', ['container', 'key', 'value', 'path'])
+    if index is not None:
+        path = index.find(node, search)
+        container = container_at(node, path)
+        return ContainerResult(container, path[-1], container[path[-1]], path)
+
     leaves = walk_containers(node, search)
     if not leaves:
         raise KeyError(search)
@@ -40,32 +55,43 @@ def find_container(node:dict, search:str):
         raise AmbigousNameError(search, paths)
 
     container, key, path, _ = leaves[0]
-    return Result(container, key, container[key], path)
+    return ContainerResult(container, key, container[key], path)
 
-def walk_containers(node:dict, search:str):
+def walk_containers(node:dict, search:str, index:'NameIndex'=None):
     """
     Walks a nested dictionary `node`
 
     Args:
         node (dict): a nested dictionary
         search (str): a search pattern
+        index (NameIndex): optional prebuilt index of `node`
 
     Returns:
         list: a list of (container, key, path, matches) tuples
     """
-    Result = namedtuple('Result', ['container', 'key', 'path', 'matches'])
     parts = munge(search).split('.')
     # first pass, find any match on the last key part
-    leaves = list(_walk_containers(node, parts[-1]))
+    if index is not None:
+        leaves = [(container_at(node, path), path[-1], path) for path in index.prefixed(parts[-1])]
+    else:
+        leaves = list(_walk_containers(node, parts[-1]))
     # second pass, compare full dotted paths
     leaves = [(container, key, path, PathMatch(path=path, search=parts)) for (container, key, path) in leaves]
 
     # third pass, filter out conflicting key parts
     leaves= [l for l in leaves if l[3].score]
     leaves = sorted(leaves, key=lambda x: x[3].score, reverse=True)
-    leaves = [Result(*l) for l in leaves]
+    leaves = [WalkResult(*l) for l in leaves]
     return leaves
 
+def container_at(node:dict, path:list):
+    """
+    Returns the dictionary holding the last key of `path`
+    """
+    for key in path[:-1]:
+        node = node[key]
+    return node
+
 def key_matches(key:str, search:str):
     """
     Returns True if `key` matches `search` pattern
@@ -128,7 +154,7 @@ class PathMatch:
         """
         return self.last_word_score - self.inner_jumps * 10
 
-    @property
+    @cached_property
     def pattern(self):
         """
         Returns the pattern of matches
@@ -195,3 +221,79 @@ def _walk_containers(node:dict, search:str, path:list=None):
             yield (node, key, path + [key])
     for (key, child) in child_dicts(node):
         yield from _walk_containers(child, search, path + [key])
+
+def _walk_paths(node:dict, path:list=None):
+    """
+    Yields the path of every key, in the same order as `_walk_containers`
+    """
+    path = path or []
+    for key in node:
+        yield path + [key]
+    for (key, child) in child_dicts(node):
+        yield from _walk_paths(child, path + [key])
+
+class NameIndex:
+    """
+    Prebuilt name lookup for a nested dictionary
+
+    Keys are stored munged alongside the order `_walk_containers` would visit
+    them, so a prefix search returns the same candidates as a full walk.
+    Results of `find` are memoized; build a new index when keys are added,
+    removed, or a dictionary value is replaced.
+    """
+    def __init__(self, node:dict):
+        self.paths = {}
+        for order, path in enumerate(_walk_paths(node)):
+            self.paths.setdefault(munge(path[-1]), []).append((order, tuple(path)))
+        self.keys = sorted(self.paths)
+        self._found = {}
+
+    def __len__(self):
+        return sum(len(paths) for paths in self.paths.values())
+
+    def prefixed(self, search:str):
+        """
+        Returns the paths whose last key starts with `search`, in walk order
+        """
+        search = munge(search)
+        if not search:
+            return []
+        matches = []
+        for i in range(bisect_left(self.keys, search), len(self.keys)):
+            key = self.keys[i]
+            if not key.startswith(search):
+                break
+            matches.extend(self.paths[key])
+        return [list(path) for (_, path) in sorted(matches)]
+
+    def find(self, node:dict, search:str):
+        """
+        Returns the path of the best match for `search`
+
+        Raises the same KeyError or AmbigousNameError as `find_container`
+        """
+        try:
+            found = self._found[search]
+        except KeyError:
+            found = self._find(node, search)
+            self._found[search] = found
+        if isinstance(found, tuple):
+            error, args = found
+            raise error(*args)
+        return list(found)
+
+    def _find(self, node:dict, search:str):
+        # Prefix matches on the last key score at most 100, so a single best
+        # exact match scoring above that wins without scoring the rest
+        parts = munge(search).split('.')
+        exact = [PathMatch(path=list(path), search=parts) for (_, path) in self.paths.get(parts[-1], [])]
+        exact = sorted([m for m in exact if m.score > 100], key=lambda m: m.score, reverse=True)
+        if exact and (len(exact) == 1 or exact[0].score > exact[1].score):
+            return exact[0].path
+
+        leaves = walk_containers(node, search, index=self)
+        if not leaves:
+            return (KeyError, (search,))
+        if len(leaves) > 1 and leaves[0].matches.score == leaves[1].matches.score:
+            return (AmbigousNameError, (search, [l.path for l in leaves]))
+        return leaves[0].path
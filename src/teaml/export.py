@@ -0,0 +1,255 @@
+"""
+Columnar export of computed models and scenarios
+
+Every exported value is a row of five columns:
+
+    scenario  int64           index of the scenario, 0 for a single model
+    path      string          munged dotted key of the node
+    value     float64         numbers, null otherwise
+    text      string          strings and errors, null otherwise
+    series    list<float64>   ranges of numbers, null otherwise
+
+`write` picks the format from the file extension: '.parquet', '.arrow' or
+'.feather' need pyarrow; '.tcol' is a dependency free columnar format that
+`read` maps back without copying.
+
+A '.tcol' file is 'TEAMLCOL', a little endian uint32 version and header
+length, then a JSON header giving the row count and, per column, its type
+and the [offset, length] of each of its buffers, from the first buffer.
+Buffers are little endian and aligned to 8 bytes: 'data' for int64 and
+float64, 'offsets' (int64, rows + 1) with 'data' for strings and 'values'
+for float64 lists, and a uint8 'valid' per row for nullable columns.
+"""
+
+import json
+import math
+import struct
+import sys
+from array import array
+
+from teaml.formula.vector import vector_types
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b'TEAMLCOL'
+VERSION = 1
+ALIGNMENT = 8
+SCHEMA = {
+    'scenario': 'int64',
+    'path': 'string',
+    'value': 'float64',
+    'text': 'string',
+    'series': 'list<float64>',
+}
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def columns(results):
+    """
+    The export columns for {path: value} per scenario
+
+    Args:
+        results (list): {key: value} for each scenario
+
+    Returns:
+        dict: {column: list}, with None for nulls. Series are the ranges
+            themselves, not copies.
+    """
+    table = {name: [] for name in SCHEMA}
+    for scenario, values in enumerate(results):
+        for key, value in values.items():
+            number = text = series = None
+            if is_number(value):
+                number = float(value)
+            elif isinstance(value, vector_types) and all(is_number(v) for v in value):
+                series = value
+            elif value is not None:
+                text = str(value)
+            table['scenario'].append(scenario)
+            table['path'].append(key)
+            table['value'].append(number)
+            table['text'].append(text)
+            table['series'].append(series)
+    return table
+
+def flattened(series):
+    """
+    (offsets, values) of a list column, one concatenation of the ranges
+    """
+    lengths = [0 if s is None else len(s) for s in series]
+    if numpy is not None:
+        offsets = numpy.zeros(len(series) + 1, dtype='<i8')
+        numpy.cumsum(lengths, out=offsets[1:])
+        present = [numpy.asarray(s, dtype='<f8') for s in series if s is not None]
+        values = numpy.concatenate(present) if present else numpy.empty(0, dtype='<f8')
+        return offsets, values
+    offsets = array('q', [0])
+    values = array('d')
+    for s, length in zip(series, lengths):
+        offsets.append(offsets[-1] + length)
+        if s is not None:
+            values.extend(float(v) for v in s)
+    return offsets, values
+
+def arrow_table(table):
+    """
+    A pyarrow Table of export `columns`
+
+    The concatenated series values are handed to Arrow without a further
+    copy.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("pyarrow is required for Arrow and Parquet, or export to .tcol")
+    offsets, values = flattened(table['series'])
+    # 32 bit offsets unless there are too many values
+    lists, offset_type = (pa.ListArray, pa.int32()) if len(values) < 2 ** 31 else (pa.LargeListArray, pa.int64())
+    series = lists.from_arrays(
+        pa.array(offsets, type=offset_type),
+        pa.array(values, type=pa.float64()),
+        mask=pa.array([s is None for s in table['series']]))
+    return pa.table({
+        'scenario': pa.array(table['scenario'], type=pa.int64()),
+        'path': pa.array(table['path'], type=pa.string()),
+        'value': pa.array(table['value'], type=pa.float64()),
+        'text': pa.array(table['text'], type=pa.string()),
+        'series': series,
+    })
+
+def write(filename, table):
+    """
+    Writes export `columns` to `filename`, formatted by its extension
+    """
+    name = str(filename)
+    if name.endswith('.tcol'):
+        return write_columnar(name, table)
+    if name.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        pq.write_table(arrow_table(table), name)
+    elif name.endswith(('.arrow', '.feather')):
+        arrow = arrow_table(table)
+        import pyarrow as pa
+        with pa.OSFile(name, 'wb') as sink, pa.ipc.new_file(sink, arrow.schema) as writer:
+            writer.write_table(arrow)
+    else:
+        raise ValueError(f"Unknown export format: {name}, use .parquet, .arrow, .feather or .tcol")
+
+def little_endian(data):
+    if sys.byteorder == 'big' and isinstance(data, array):
+        data = array(data.typecode, data)
+        data.byteswap()
+    if numpy is not None and isinstance(data, numpy.ndarray):
+        return data.astype(data.dtype.newbyteorder('<'), copy=False).tobytes()
+    return bytes(data)
+
+def buffers(kind, column):
+    """
+    {buffer: bytes} for one column
+    """
+    valid = bytes(0 if v is None else 1 for v in column)
+    if kind == 'int64':
+        return {'data': little_endian(array('q', column))}
+    if kind == 'float64':
+        data = array('d', (math.nan if v is None else v for v in column))
+        return {'data': little_endian(data), 'valid': valid}
+    if kind == 'string':
+        encoded = [b'' if v is None else v.encode('utf-8') for v in column]
+        offsets = array('q', [0])
+        for item in encoded:
+            offsets.append(offsets[-1] + len(item))
+        return {'offsets': little_endian(offsets), 'data': b''.join(encoded), 'valid': valid}
+    offsets, values = flattened(column)
+    return {'offsets': little_endian(offsets), 'values': little_endian(values), 'valid': valid}
+
+def write_columnar(filename, table):
+    """
+    Writes export `columns` as a '.tcol' file
+    """
+    rows = len(table['path'])
+    blobs = []
+    header = {'rows': rows, 'columns': []}
+    offset = 0
+    for name, kind in SCHEMA.items():
+        entry = {'name': name, 'type': kind, 'buffers': {}}
+        for buffer, data in buffers(kind, table[name]).items():
+            entry['buffers'][buffer] = [offset, len(data)]
+            padding = -len(data) % ALIGNMENT
+            blobs += [data, b'\0' * padding]
+            offset += len(data) + padding
+        header['columns'].append(entry)
+    text = json.dumps(header).encode('utf-8')
+    with open(filename, 'wb') as f:
+        f.write(MAGIC + struct.pack('<II', VERSION, len(text)) + text)
+        f.write(b'\0' * padding_after(len(text)))
+        for blob in blobs:
+            f.write(blob)
+
+def padding_after(header_length):
+    """
+    Bytes between the header and the first buffer, aligning the buffers
+    """
+    return -(len(MAGIC) + 8 + header_length) % ALIGNMENT
+
+def read(filename):
+    """
+    The columns of a '.tcol' file
+
+    With NumPy the file is memory mapped: numbers are arrays over it, with
+    NaN for nulls, and each series is a view of it. Without NumPy they are
+    Python arrays and lists. Strings and nulls are lists.
+
+    Returns:
+        dict: {column: values}
+    """
+    with open(filename, 'rb') as f:
+        prefix = f.read(len(MAGIC) + 8)
+        if prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a teaml columnar file: {filename}")
+        version, length = struct.unpack('<II', prefix[len(MAGIC):])
+        if version != VERSION:
+            raise ValueError(f"Unsupported columnar version {version}: {filename}")
+        header = json.loads(f.read(length))
+        f.read(padding_after(length))
+        data = None if numpy is not None else f.read()
+    start = len(MAGIC) + 8 + length + padding_after(length)
+    if numpy is not None:
+        mapped = numpy.memmap(filename, dtype='u1', mode='r')
+
+        def buffer(offset, size, dtype):
+            return mapped[start + offset:start + offset + size].view(dtype)
+    else:
+        def buffer(offset, size, dtype):
+            raw = data[offset:offset + size]
+            if dtype == 'u1':
+                return raw
+            values = array({'<i8': 'q', '<f8': 'd'}[dtype])
+            values.frombytes(raw)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            return values
+
+    table = {}
+    for entry in header['columns']:
+        spans = entry['buffers']
+        kind = entry['type']
+        valid = buffer(*spans['valid'], 'u1') if 'valid' in spans else None
+        if kind in ('int64', 'float64'):
+            table[entry['name']] = buffer(*spans['data'], '<i8' if kind == 'int64' else '<f8')
+            continue
+        offsets = buffer(*spans['offsets'], '<i8')
+        if kind == 'string':
+            raw = bytes(buffer(*spans['data'], 'u1'))
+            table[entry['name']] = [
+                raw[offsets[i]:offsets[i + 1]].decode('utf-8') if valid[i] else None
+                for i in range(header['rows'])]
+        else:
+            values = buffer(*spans['values'], '<f8')
+            table[entry['name']] = [
+                values[offsets[i]:offsets[i + 1]] if valid[i] else None
+                for i in range(header['rows'])]
+    return table
@@ -0,0 +1,128 @@
+"""
+Dual numbers for forward mode differentiation of formulas
+"""
+
+import math
+
+def _grad(x):
+    return x.grad if isinstance(x, Dual) else {}
+
+def _plain(x):
+    return float(x) if isinstance(x, Dual) else x
+
+def _number(x):
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+def _combine(a, ca, b, cb):
+    """
+    ca * a + cb * b for gradients `a` and `b`
+    """
+    result = {k: ca * v for k, v in a.items()}
+    for k, v in b.items():
+        result[k] = result.get(k, 0.0) + cb * v
+    return result
+
+class Dual(float):
+    """
+    A number with its partial derivatives
+
+    `grad` maps each seeded input to d(self)/d(input). Arithmetic with
+    numbers and other Duals carries the derivatives along; anything that
+    converts a Dual to a plain float, such as `math` functions, drops them.
+    The float value is computed exactly as it would be without derivatives.
+    """
+    __slots__ = ('grad',)
+
+    def __new__(cls, value, grad=None):
+        self = float.__new__(cls, value)
+        self.grad = grad or {}
+        return self
+
+    def __reduce__(self):
+        return (Dual, (float(self), self.grad))
+
+    def __add__(self, other):
+        if not _number(other):
+            return NotImplemented
+        return Dual(float(self) + _plain(other), _combine(self.grad, 1.0, _grad(other), 1.0))
+
+    def __radd__(self, other):
+        if not _number(other):
+            return NotImplemented
+        return Dual(_plain(other) + float(self), _combine(self.grad, 1.0, _grad(other), 1.0))
+
+    def __sub__(self, other):
+        if not _number(other):
+            return NotImplemented
+        return Dual(float(self) - _plain(other), _combine(self.grad, 1.0, _grad(other), -1.0))
+
+    def __rsub__(self, other):
+        if not _number(other):
+            return NotImplemented
+        return Dual(_plain(other) - float(self), _combine(self.grad, -1.0, _grad(other), 1.0))
+
+    def __mul__(self, other):
+        if not _number(other):
+            return NotImplemented
+        return Dual(float(self) * _plain(other), _combine(self.grad, float(other), _grad(other), float(self)))
+
+    def __rmul__(self, other):
+        if not _number(other):
+            return NotImplemented
+        return Dual(_plain(other) * float(self), _combine(self.grad, float(other), _grad(other), float(self)))
+
+    def __truediv__(self, other):
+        if not _number(other):
+            return NotImplemented
+        value = float(self) / _plain(other)
+        return Dual(value, _combine(self.grad, 1.0 / float(other), _grad(other), -value / float(other)))
+
+    def __rtruediv__(self, other):
+        if not _number(other):
+            return NotImplemented
+        value = _plain(other) / float(self)
+        return Dual(value, _combine(_grad(other), 1.0 / float(self), self.grad, -value / float(self)))
+
+    def __pow__(self, other):
+        if not _number(other):
+            return NotImplemented
+        return _power(self, other, float(self) ** _plain(other))
+
+    def __rpow__(self, other):
+        if not _number(other):
+            return NotImplemented
+        return _power(other, self, _plain(other) ** float(self))
+
+    def __neg__(self):
+        return Dual(-float(self), {k: -v for k, v in self.grad.items()})
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return self if self >= 0 else -self
+
+def _power(base, exponent, value):
+    """
+    Dual for base ** exponent, either of which may be a Dual
+    """
+    if isinstance(value, complex):
+        return value
+    grad = {}
+    if _grad(base):
+        b, e = float(base), float(exponent)
+        scale = e * b ** (e - 1) if b != 0 or e >= 1 else 0.0
+        grad = _combine(grad, 1.0, _grad(base), scale)
+    if _grad(exponent) and float(base) > 0:
+        grad = _combine(grad, 1.0, _grad(exponent), value * math.log(float(base)))
+    return Dual(value, grad)
+
+def carries_dual(value):
+    """
+    True if `value`, or an element of it, is a Dual
+    """
+    if isinstance(value, Dual):
+        return True
+    if isinstance(value, (list, tuple)):
+        return any(carries_dual(v) for v in value)
+    return False
@@ -0,0 +1,266 @@
+"""
+Financial functions for formulas: npv, irr, xirr and pmt
+
+These follow pyxirr's conventions and are used when it isn't installed.
+With pyxirr, it still computes single series and these compute batches.
+
+A batch is a 2-D set of cash flows, one series per row, such as a list of
+lists or a 2-D NumPy array. The rates of a batch are found together by
+Newton's method over NumPy arrays when NumPy is importable; rows that
+don't converge, and every row without NumPy, are solved one at a time.
+Batches give NaN for a series without a rate, instead of raising.
+"""
+
+import math
+from datetime import date, datetime
+
+from teaml.formula.vector import vector
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TOLERANCE = 1e-10
+MAX_ITERATIONS = 50
+# Rows solved together, bounding the size of the work arrays
+CHUNK = 65536
+
+def is_batch(values):
+    """
+    True for 2-D cash flows, a series per row
+    """
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return values.ndim == 2
+    if isinstance(values, (list, tuple)) and values:
+        first = values[0]
+        return isinstance(first, (list, tuple)) or (numpy is not None and isinstance(first, numpy.ndarray))
+    return False
+
+def as_rows(values):
+    """
+    2-D float array of a batch, shorter series padded with zeros at the end
+
+    A zero flow after the last one leaves the npv and irr unchanged.
+    """
+    if isinstance(values, numpy.ndarray):
+        return values.astype(float, copy=False)
+    width = max(len(row) for row in values)
+    rows = numpy.zeros((len(values), width))
+    for i, row in enumerate(values):
+        rows[i, :len(row)] = row
+    return rows
+
+def check_payments(values):
+    if not (any(v < 0 for v in values) and any(v > 0 for v in values)):
+        raise ValueError("negative and positive payments are required")
+
+def present_value(rate, values, times):
+    return sum(v * (1 + rate) ** -t for v, t in zip(values, times))
+
+def newton(values, times, guess):
+    """
+    Root of present_value from `guess`, or None if it doesn't converge
+    """
+    rate = guess
+    for _ in range(MAX_ITERATIONS):
+        base = 1 + rate
+        f = 0.0
+        df = 0.0
+        for v, t in zip(values, times):
+            discounted = v * base ** -t
+            f += discounted
+            df -= t * discounted / base
+        if df == 0 or not math.isfinite(f):
+            return None
+        step = f / df
+        new = rate - step
+        if new <= -1:
+            # Stay above -100%, where discounting is defined
+            new = (rate - 1) / 2
+        if abs(new - rate) <= TOLERANCE * max(1.0, abs(rate)):
+            return new
+        rate = new
+    return None
+
+def bisect(values, times):
+    """
+    Root of present_value found by scanning for a sign change
+    """
+    grid = [-0.99, -0.9, -0.75, -0.5, -0.25, 0.0, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 100.0]
+    previous = None
+    for rate in grid:
+        f = present_value(rate, values, times)
+        if f == 0:
+            return rate
+        if previous is not None and (f > 0) != (previous[1] > 0):
+            low, high = previous[0], rate
+            f_low = previous[1]
+            for _ in range(200):
+                mid = (low + high) / 2
+                f_mid = present_value(mid, values, times)
+                if (f_mid > 0) == (f_low > 0):
+                    low, f_low = mid, f_mid
+                else:
+                    high = mid
+                if high - low <= TOLERANCE * max(1.0, abs(mid)):
+                    break
+            return (low + high) / 2
+        previous = (rate, f)
+    return None
+
+def rate_of_return(values, times, guess):
+    values = [float(v) for v in values]
+    check_payments(values)
+    rate = newton(values, times, guess)
+    if rate is None:
+        rate = bisect(values, times)
+    if rate is None:
+        raise ValueError("IRR not found")
+    return rate
+
+def batch_rates(values, times, guess):
+    """
+    Rates of return for each row of 2-D `values`, NaN where there is none
+    """
+    if numpy is None:
+        rates = []
+        for row in values:
+            try:
+                rates.append(rate_of_return(row, times, guess))
+            except (ValueError, ArithmeticError):
+                rates.append(math.nan)
+        return vector(rates)
+    values = as_rows(values)
+    times = numpy.asarray(times, dtype=float)
+    if len(times) != values.shape[1]:
+        raise ValueError(f"{len(times)} dates for {values.shape[1]} amounts")
+    chunks = [newton_rows(values[i:i + CHUNK], times, guess) for i in range(0, len(values), CHUNK)]
+    rates = numpy.concatenate(chunks) if chunks else numpy.empty(0)
+    return vector(rates.tolist())
+
+def newton_rows(values, times, guess):
+    """
+    Newton's method on every row at once, stragglers solved one at a time
+    """
+    evenly_spaced = numpy.array_equal(times, numpy.arange(len(times)))
+    columns = numpy.ascontiguousarray(values.T)
+    rates = numpy.full(len(values), float(guess))
+    active = numpy.ones(len(values), dtype=bool)
+    with numpy.errstate(all='ignore'):
+        for _ in range(MAX_ITERATIONS):
+            if not active.any():
+                break
+            if evenly_spaced:
+                f, df = horner(columns, rates)
+            else:
+                f, df = discounted_sums(values, times, rates)
+            new = rates - f / df
+            new = numpy.where(new <= -1, (rates - 1) / 2, new)
+            done = numpy.abs(new - rates) <= TOLERANCE * numpy.maximum(1.0, numpy.abs(rates))
+            stuck = ~numpy.isfinite(new)
+            rates = numpy.where(active, new, rates)
+            rates[active & stuck] = numpy.nan
+            active &= ~(done | stuck)
+        unsolved = active | numpy.isnan(rates)
+    for i in numpy.flatnonzero(unsolved):
+        try:
+            rates[i] = rate_of_return(values[i].tolist(), times.tolist(), guess)
+        except (ValueError, ArithmeticError):
+            rates[i] = numpy.nan
+    return rates
+
+def horner(columns, rates):
+    """
+    Present values at `rates` and their derivatives, for flows at 0, 1, 2...
+
+    The present value is a polynomial in x = 1 / (1 + rate), evaluated a
+    column at a time rather than raising every element to a power.
+    """
+    x = 1 / (1 + rates)
+    p = numpy.zeros_like(rates)
+    dp = numpy.zeros_like(rates)
+    for column in columns[::-1]:
+        dp = dp * x + p
+        p = p * x + column
+    return p, -x * x * dp
+
+def discounted_sums(values, times, rates):
+    base = 1 + rates
+    discounted = values * base[:, None] ** -times
+    return discounted.sum(axis=1), -(discounted * times).sum(axis=1) / base
+
+def irr(values, guess=0.1):
+    """
+    Internal rate of return of evenly spaced cash flows
+
+    `values` may be a batch, giving a vector of rates.
+    """
+    if is_batch(values):
+        width = max(len(row) for row in values)
+        return batch_rates(values, list(range(width)), guess)
+    return rate_of_return(list(values), range(len(values)), guess)
+
+def as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    raise TypeError(f"Not a date: {value!r}")
+
+def year_fractions(dates):
+    """
+    Years from the first date, counting 365 days a year
+    """
+    dates = [as_date(d) for d in dates]
+    first = dates[0]
+    return [(d - first).days / 365 for d in dates]
+
+def xirr(dates, amounts, guess=0.1):
+    """
+    Internal rate of return of cash flows on `dates`
+
+    `amounts` may be a batch of series sharing the dates, giving a vector
+    of rates. Dates are dates, datetimes or ISO format strings.
+    """
+    times = year_fractions(dates)
+    if is_batch(amounts):
+        return batch_rates(amounts, times, guess)
+    if len(times) != len(amounts):
+        raise ValueError(f"{len(times)} dates for {len(amounts)} amounts")
+    return rate_of_return(list(amounts), times, guess)
+
+def npv(rate, values, start_from_zero=True):
+    """
+    Net present value of evenly spaced cash flows, the first at time zero
+
+    `values` may be a batch, giving a vector of values, and `rate` a rate
+    per row.
+    """
+    start = 0 if start_from_zero else 1
+    if not is_batch(values):
+        return sum(v / (1 + rate) ** (i + start) for i, v in enumerate(values))
+    if numpy is None:
+        rates = rate if isinstance(rate, (list, tuple)) else [rate] * len(values)
+        return vector([npv(r, row, start_from_zero) for r, row in zip(rates, values)])
+    values = as_rows(values)
+    rates = numpy.asarray(rate, dtype=float).reshape(-1, 1)
+    times = numpy.arange(start, values.shape[1] + start)
+    return vector((values * (1 + rates) ** -times).sum(axis=1).tolist())
+
+def pmt(rate, nper, pv, fv=0, *, pmt_at_beginning=False):
+    """
+    Payment per period of a loan or annuity
+    """
+    for arg in (rate, nper, pv, fv):
+        if isinstance(arg, str):
+            raise ValueError(arg)
+    if rate == 0:
+        return -(pv + fv) / nper
+    growth = (1 + rate) ** nper
+    payment = -(fv + pv * growth) * rate / (growth - 1)
+    if pmt_at_beginning:
+        payment /= 1 + rate
+    return payment
@@ -1,8 +1,10 @@
 import ast
+import marshal
 import builtins
 import math
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 
+from teaml.formula import finance
 from teaml.utils import munge
 
 currencies = {'USD':'$'}
@@ -36,6 +38,18 @@ def clean_error(e):
         .replace(": ", ":")
     )
 
+def error_string(e):
+    """
+    The '#error(...)' result for an exception raised by a formula
+    """
+    if isinstance(e, TypeError):
+        return f'#error(type {clean_error(e)})'
+    if isinstance(e, ZeroDivisionError):
+        return '#error(zerodiv)'
+    if isinstance(e, KeyError):
+        return f'#error(key {clean_error(e)})'
+    return f'#error({clean_error(e)})'
+
 def roundup(number, digits=0):
     multiplier = 10 ** digits
     return math.ceil(number * multiplier) / multiplier
@@ -54,7 +68,24 @@ class Parser:
     def __init__(self, source, sandbox):
         self.source = source
         self.sandbox = sandbox
-        self.tree = ast.parse(munge(source))
+        self._tree = None
+        self._names = None
+        self._code = None
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = ast.parse(munge(self.source))
+        return self._tree
+
+    @property
+    def code(self):
+        """
+        The source compiled for `eval`
+        """
+        if self._code is None:
+            self._code = compile(self.source, '<string>', 'eval')
+        return self._code
 
     def node_desc(self, node):
         return getattr(node, 'id', None) or getattr(node, 'attr')
@@ -71,46 +102,98 @@ class Parser:
 
     @property
     def names(self):
-        return [n for n in self._names() if not self.should_exclude(n)]
+        if self._names is None:
+            self._names = tuple(n for n in self._walk_names() if not self.should_exclude(n))
+        return list(self._names)
 
-    def _names(self):
+    def _walk_names(self):
         for n in ast.walk(self.tree):
             if isinstance(n, ast.Name):
                 yield n.id
             elif isinstance(n, ast.Attribute):
                 yield '.'.join(self.full_node_path(n))
 
-def create_namedtuples(data):
-    data = filter_bases(data)
-
-    # Step 1: Parse the dictionary keys to create a nested structure
-    nested_data = {}
-    for key, value in data.items():
-        parts = key.split('.')
-        d = nested_data
-        for part in parts[:-1]:
-            if part not in d:
-                d[part] = {}
-            d = d[part]
-        d[parts[-1]] = value
-
-    # Step 2: Create namedtuples for each level of the nested structure
-    def create_namedtuple(name, d):
-        fields = {k: v for k, v in d.items() if not isinstance(v, dict)}
-        nested_fields = {k: create_namedtuple(k, v) for k, v in d.items() if isinstance(v, dict)}
-        all_fields = {**fields, **nested_fields}
-        NamedTuple = namedtuple(name, all_fields.keys())
-        return NamedTuple(**all_fields)
-
-    # Step 3: Populate the namedtuples with the corresponding values from the dictionary
-    result = {}
-    for key, value in nested_data.items():
-        if isinstance(value, dict):
-            result[key] = create_namedtuple(key, value)
-        else:
-            result[key] = value
+class FormulaCache:
+    """
+    Bounded LRU of Parsers keyed by formula text
 
-    return result
+    Each entry keeps the AST, the reference names and the compiled code, so
+    a formula is only parsed and compiled once while it stays in the cache.
+    """
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source, factory):
+        try:
+            entry = self.entries[source]
+        except KeyError:
+            self.misses += 1
+            entry = factory(source)
+            self.entries[source] = entry
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+            return entry
+        self.hits += 1
+        self.entries.move_to_end(source)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+class ContextShape:
+    """
+    How `create_namedtuples` arranges one set of reference names
+
+    Dotted names become fields of nested namedtuples. The classes are made
+    once per shape, so building a context only fills them with values.
+    """
+    def __init__(self, names):
+        nested = {}
+        for key in filter_bases(dict.fromkeys(names)):
+            parts = key.split('.')
+            d = nested
+            for part in parts[:-1]:
+                if part not in d:
+                    d[part] = {}
+                d = d[part]
+            d[parts[-1]] = key
+        self.fields = [(name, self._spec(name, value)) for name, value in nested.items()]
+
+    def _spec(self, name, d):
+        """
+        A key of the data, or (namedtuple class, field specs)
+        """
+        if not isinstance(d, dict):
+            return d
+        fields = [(k, v) for k, v in d.items() if not isinstance(v, dict)]
+        fields += [(k, self._spec(k, v)) for k, v in d.items() if isinstance(v, dict)]
+        NamedTuple = namedtuple(name, [k for k, _ in fields])
+        return (NamedTuple, [spec for _, spec in fields])
+
+    def build(self, data):
+        return {name: self._fill(spec, data) for name, spec in self.fields}
+
+    def _fill(self, spec, data):
+        if isinstance(spec, str):
+            return data[spec]
+        NamedTuple, specs = spec
+        return NamedTuple(*[self._fill(s, data) for s in specs])
+
+_shapes = FormulaCache(4096)
+
+def create_namedtuples(data):
+    """
+    Nests dotted keys of `data` into namedtuples, see `ContextShape`
+    """
+    return _shapes.get(tuple(data), ContextShape).build(data)
 
 def filter_bases(data):
     """
@@ -125,29 +208,28 @@ def filter_bases(data):
     """
     dotted = [k for k in data if '.' in k]
     # Chop off the last part of the dotted keys
-    bases = []
+    bases = set()
     for k in dotted:
         # Ignore the last part, that will be the key
         parts = k.split('.')[:-1]
         # Add all the prefix levels
         while parts:
-            bases.append('.'.join(parts))
+            bases.add('.'.join(parts))
             parts.pop()
     result = {k: data[k] for k in data if k not in bases}
     return result
 
-def unsupported(*args):
-    raise NotImplementedError("Unsupported operation")
-
 class Computer:
-    def __init__(self):
+    def __init__(self, cache_size=4096):
+        self.cache = FormulaCache(cache_size)
         self.sandbox = {
             'concat': concat,
             'iferror': iferror,
-            'irr': unsupported,
+            'irr': finance.irr,
             'iserror': iserror,
-            'pmt': unsupported,
-            'npv': unsupported,
+            'pmt': finance.pmt,
+            'npv': finance.npv,
+            'xirr': finance.xirr,
             'range':listify(builtins.range),
             'roundup': roundup,
             'sumif': sumif,
@@ -168,18 +250,62 @@ class Computer:
                     return fn(*args, **kwargs)
                 return wrapped
 
+            # pyxirr computes single series, batches use teaml.formula.finance
+            def irr(values, guess=0.1):
+                if finance.is_batch(values):
+                    return finance.irr(values, guess)
+                return xfn.irr(values, guess=guess)
+
+            def npv(rate, values, start_from_zero=True):
+                if finance.is_batch(values):
+                    return finance.npv(rate, values, start_from_zero)
+                return xfn.npv(rate, values, start_from_zero=start_from_zero)
+
+            def xirr(dates, amounts, guess=0.1):
+                if finance.is_batch(amounts):
+                    return finance.xirr(dates, amounts, guess)
+                return xfn.xirr(dates, amounts, guess=guess)
+
             return {
-                'irr': lambda values, guess: xfn.irr(values, guess=guess),
-                'npv': xfn.npv,
+                'irr': irr,
+                'npv': npv,
                 'pmt': safety_wrapper(xfn.pmt),
+                'xirr': xirr,
             }
         except ImportError:
-            print("Warning: pyxirr not available.  No IRR/NPV functions.")
             return {}
 
     def parse(self, source):
+        return self.cache.get(munge(source), self._parser)
+
+    def _parser(self, source):
         return Parser(source, sandbox=self.sandbox)
 
+    def compiled(self, sources):
+        """
+        Returns {source: (names, marshalled code)} for caching on disk
+
+        Sources that don't parse are left out, to raise when computed.
+        """
+        compiled = {}
+        for source in sources:
+            parser = self.cache.get(source, self._parser)
+            try:
+                compiled[source] = (tuple(parser.names), marshal.dumps(parser.code))
+            except (SyntaxError, ValueError):
+                continue
+        return compiled
+
+    def preload(self, compiled):
+        """
+        Fills the formula cache from the output of `compiled`
+        """
+        for source, (names, code) in compiled.items():
+            parser = self._parser(source)
+            parser._names = names
+            parser._code = marshal.loads(code)
+            self.cache.get(source, lambda _: parser)
+
     def compute(self, formula, context):
         """
         Compute a formula using the given context and a sandbox.
@@ -189,14 +315,9 @@ class Computer:
         local_sandbox['eval'] = lambda f: self.compute(f, context)
         try:
             # TODO: ast.literal_eval
-            return eval(formula, local_sandbox, context)
-        except TypeError as e:
-            return f'#error(type {clean_error(e)})'
-        except ZeroDivisionError:
-            return '#error(zerodiv)'
-        except KeyError as e:
-            return f'#error(key {clean_error(e)})'
+            code = self.cache.get(formula, self._parser).code
+            return eval(code, local_sandbox, context)
         except Exception as e:
-            return f'#error({clean_error(e)})'
+            return error_string(e)
 
 computer = Computer()
@@ -1,21 +1,58 @@
 """
+Elementwise arithmetic for ranges used in formulas
+
+`vector` picks the implementation: `ArrayVector` (NumPy) for numeric
+values when NumPy is importable, the pure Python `Vector` otherwise.
+Both give the same results and print the same way.
 """
 
+import operator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Largest int64, int results that could pass it are computed by Vector
+INT64_MAX = 2 ** 63 - 1
+# Ints a float64 holds exactly, int division beyond it is done by Vector
+FLOAT_EXACT = 2 ** 53
+
+# Types that implement arithmetic with vectors themselves, see `defer_to`
+deferred_types = ()
+
+def defer_to(cls):
+    """
+    Makes vectors return NotImplemented for `cls`, so its reflected
+    operators run instead of the vector giving None
+    """
+    global deferred_types
+    if cls not in deferred_types:
+        deferred_types = deferred_types + (cls,)
+
+def deferred(other):
+    return NotImplemented if isinstance(other, deferred_types) else None
+
 class Vector(list):
     def __pow__(self, other):
+        if isinstance(other, deferred_types):
+            return NotImplemented
         assert isinstance(other, (int, float))
         return Vector([x ** other for x in self])
 
     def __rpow__(self, other):
+        if isinstance(other, deferred_types):
+            return NotImplemented
         assert isinstance(other, (int, float))
         return Vector([other ** x for x in self])
 
     def __mul__(self, other):
         if isinstance(other, (int, float)):
             return Vector([x * other for x in self])
-        if isinstance(other, Vector):
+        if isinstance(other, vector_classes):
             assert len(self) == len(other), f"Vector lengths: {len(self)} != {len(other)}"
             return Vector([x * y for x, y in zip(self, other)])
+        return deferred(other)
 
     def __rmul__(self, other):
         return self.__mul__(other)
@@ -23,23 +60,26 @@ class Vector(list):
     def __truediv__(self, other):
         if isinstance(other, (int, float)):
             return Vector([x / other for x in self])
-        if isinstance(other, Vector):
+        if isinstance(other, vector_classes):
             assert len(self) == len(other), f"Vector lengths: {len(self)} != {len(other)}"
             return Vector([x / y for x, y in zip(self, other)])
+        return deferred(other)
 
     def __rtruediv__(self, other):
         if isinstance(other, (int, float)):
             return Vector([other / x for x in self])
-        if isinstance(other, Vector):
+        if isinstance(other, vector_classes):
             assert len(self) == len(other), f"Vector lengths: {len(self)} != {len(other)}"
             return Vector([x / y for x, y in zip(other, self)])
+        return deferred(other)
 
     def __add__(self, other):
         if isinstance(other, (int, float)):
             return Vector([x + other for x in self])
-        if isinstance(other, Vector):
+        if isinstance(other, vector_classes):
             assert len(self) == len(other), f"Vector lengths: {len(self)} != {len(other)}"
             return Vector([x + y for x, y in zip(self, other)])
+        return deferred(other)
 
     def __radd__(self, other):
         return self.__add__(other)
@@ -47,16 +87,248 @@ class Vector(list):
     def __sub__(self, other):
         if isinstance(other, (int, float)):
             return Vector([x - other for x in self])
-        if isinstance(other, Vector):
+        if isinstance(other, vector_classes):
             assert len(self) == len(other), f"Vector lengths: {len(self)} != {len(other)}"
             return Vector([x - y for x, y in zip(self, other)])
+        return deferred(other)
 
     def __rsub__(self, other):
         if isinstance(other, (int, float)):
             return Vector([other - x for x in self])
-        if isinstance(other, Vector):
+        if isinstance(other, vector_classes):
             assert len(self) == len(other), f"Vector lengths: {len(self)} != {len(other)}"
             return Vector([y - x for x, y in zip(self, other)])
+        return deferred(other)
 
     def __neg__(self):
         return Vector([-x for x in self])
+
+def vector(values):
+    """
+    Wraps a list of values for elementwise formula arithmetic
+    """
+    if ArrayVector is not None and isinstance(values, ArrayVector):
+        return values
+    if numpy is not None and set(map(type, values)) in ({int}, {float}):
+        # Mixed ints and floats stay in a Vector, NumPy would make every
+        # element a float and print 0 as 0.0
+        array = numpy.asarray(values)
+        if array.dtype.kind in 'if':
+            return array.view(ArrayVector)
+    return Vector(values)
+
+def plain_subclass(value):
+    """
+    True for Python number subclasses, other than bool and NumPy scalars
+    """
+    return (isinstance(value, (int, float))
+        and type(value) not in (int, float, bool)
+        and not isinstance(value, numpy.generic))
+
+def widened(array):
+    """
+    `array` as int64 or float64, the types Python's ints and floats map to
+    """
+    return array.astype(numpy.int64 if array.dtype.kind == 'i' else numpy.float64, copy=False)
+
+def int_bound(values):
+    """
+    The largest magnitude in `values`, an int or int array, as a Python int
+    """
+    if isinstance(values, int):
+        return abs(values)
+    if not len(values):
+        return 0
+    return max(-int(values.min()), int(values.max()))
+
+def int_exact(name, array, other):
+    """
+    True unless `name` of int64 `array` and int `other` could differ from
+    Python's result
+    """
+    if array.dtype.kind != 'i' or isinstance(other, float) or getattr(other, 'dtype', None) == numpy.float64:
+        return True
+    a, b = int_bound(array), int_bound(other)
+    if name.endswith('truediv__'):
+        return a <= FLOAT_EXACT and b <= FLOAT_EXACT
+    if name == '__mul__':
+        return a * b <= INT64_MAX
+    return a + b <= INT64_MAX
+
+def as_vector(operation, reflected=False):
+    """
+    A method doing `operation` on the values as a Vector
+
+    Used for the operators and conversions ndarray has and list doesn't,
+    so they fail as they do for a Vector.
+    """
+    if reflected:
+        return lambda self, other: operation(other, Vector(self))
+    return lambda self, *args: operation(Vector(self), *args)
+
+if numpy is None:
+    ArrayVector = None
+else:
+    class ArrayVector(numpy.ndarray):
+        """
+        NumPy backed Vector
+
+        Operators follow Vector: numbers and vectors of the same length are
+        accepted, anything else gives None. Iterating, indexing and printing
+        give plain Python values, and == compares like a list.
+
+        Operations with a Vector, number subclasses such as Dual, and powers
+        are done per element in Python: a Vector may mix ints and floats,
+        NumPy would drop a subclass's extra state, and its vectorized pow can
+        differ from Python's in the last bit. So are int operations that
+        could overflow int64, as Python's ints don't. Operators a list
+        doesn't have fail as they do for a Vector.
+        """
+        ufuncs = {
+            '__mul__': numpy.multiply,
+            '__truediv__': numpy.true_divide,
+            '__rtruediv__': numpy.true_divide,
+            '__add__': numpy.add,
+            '__sub__': numpy.subtract,
+            '__rsub__': numpy.subtract,
+        }
+
+        def _binary(self, name, other):
+            if isinstance(other, Vector) or plain_subclass(other):
+                return getattr(Vector(self), name)(other)
+            if isinstance(other, ArrayVector):
+                assert len(self) == len(other), f"Vector lengths: {len(self)} != {len(other)}"
+                values = widened(other.view(numpy.ndarray))
+            elif isinstance(other, (int, float)):
+                values = other
+            else:
+                return deferred(other)
+            array = widened(self.view(numpy.ndarray))
+            divisor = array if name.startswith('__r') else values
+            if not int_exact(name, array, values) or (name.endswith('truediv__') and numpy.any(numpy.asarray(divisor) == 0)):
+                # Vector raises ZeroDivisionError as Python does
+                return getattr(Vector(self), name)(other)
+            ufunc = self.ufuncs[name]
+            if name.startswith('__r'):
+                return ufunc(values, array).view(ArrayVector)
+            return ufunc(array, values).view(ArrayVector)
+
+        def __pow__(self, other):
+            if isinstance(other, deferred_types):
+                return NotImplemented
+            assert isinstance(other, (int, float))
+            return vector([x ** other for x in self])
+
+        def __rpow__(self, other):
+            if isinstance(other, deferred_types):
+                return NotImplemented
+            assert isinstance(other, (int, float))
+            return vector([other ** x for x in self])
+
+        def __mul__(self, other):
+            return self._binary('__mul__', other)
+
+        def __rmul__(self, other):
+            return self.__mul__(other)
+
+        def __truediv__(self, other):
+            return self._binary('__truediv__', other)
+
+        def __rtruediv__(self, other):
+            return self._binary('__rtruediv__', other)
+
+        def __add__(self, other):
+            return self._binary('__add__', other)
+
+        def __radd__(self, other):
+            return self.__add__(other)
+
+        def __sub__(self, other):
+            return self._binary('__sub__', other)
+
+        def __rsub__(self, other):
+            return self._binary('__rsub__', other)
+
+        def __neg__(self):
+            array = widened(self.view(numpy.ndarray))
+            if array.dtype.kind == 'i' and len(array) and array.min() == -INT64_MAX - 1:
+                return -Vector(self)
+            return numpy.negative(array).view(ArrayVector)
+
+        __mod__ = as_vector(operator.mod)
+        __rmod__ = as_vector(operator.mod, reflected=True)
+        __floordiv__ = as_vector(operator.floordiv)
+        __rfloordiv__ = as_vector(operator.floordiv, reflected=True)
+        __divmod__ = as_vector(divmod)
+        __rdivmod__ = as_vector(divmod, reflected=True)
+        __matmul__ = as_vector(operator.matmul)
+        __rmatmul__ = as_vector(operator.matmul, reflected=True)
+        __and__ = as_vector(operator.and_)
+        __rand__ = as_vector(operator.and_, reflected=True)
+        __or__ = as_vector(operator.or_)
+        __ror__ = as_vector(operator.or_, reflected=True)
+        __xor__ = as_vector(operator.xor)
+        __rxor__ = as_vector(operator.xor, reflected=True)
+        __lshift__ = as_vector(operator.lshift)
+        __rlshift__ = as_vector(operator.lshift, reflected=True)
+        __rshift__ = as_vector(operator.rshift)
+        __rrshift__ = as_vector(operator.rshift, reflected=True)
+        __abs__ = as_vector(abs)
+        __pos__ = as_vector(operator.pos)
+        __invert__ = as_vector(operator.invert)
+        __int__ = as_vector(int)
+        __float__ = as_vector(float)
+        __complex__ = as_vector(complex)
+        __index__ = as_vector(operator.index)
+        __round__ = as_vector(round)
+
+        def index(self, value, *args):
+            return self.tolist().index(value, *args)
+
+        def count(self, value):
+            return self.tolist().count(value)
+
+        def __eq__(self, other):
+            return self.tolist() == other
+
+        def __ne__(self, other):
+            return not self == other
+
+        def __lt__(self, other):
+            return self.tolist() < other
+
+        def __le__(self, other):
+            return self.tolist() <= other
+
+        def __gt__(self, other):
+            return self.tolist() > other
+
+        def __ge__(self, other):
+            return self.tolist() >= other
+
+        __hash__ = None
+
+        def __bool__(self):
+            return len(self) > 0
+
+        def __iter__(self):
+            return iter(self.tolist())
+
+        def __getitem__(self, index):
+            item = super().__getitem__(index)
+            if isinstance(item, numpy.generic):
+                return item.item()
+            return item
+
+        def __repr__(self):
+            return repr(self.tolist())
+
+        def __str__(self):
+            return str(self.tolist())
+
+if ArrayVector is None:
+    vector_classes = (Vector,)
+    vector_types = (list,)
+else:
+    vector_classes = (Vector, ArrayVector)
+    vector_types = (list, ArrayVector)
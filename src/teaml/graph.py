@@ -0,0 +1,303 @@
+"""
+Dependency graph of formula nodes
+"""
+
+from collections import namedtuple
+from functools import partial
+from time import perf_counter
+
+from teaml.container import AmbigousNameError, find_container
+from teaml.formula.tea_parser import computer, filter_bases
+from teaml.node import Node
+from teaml.series import Series
+from teaml.utils import munge
+
+Schedule = namedtuple('Schedule', ['order', 'cycles'])
+
+class DependencyGraph:
+    """
+    References between the formula nodes of a Teaml
+
+    Nodes are identified by their path as a tuple. Each formula's reference
+    names are resolved the first time it's needed, bound either to the path
+    they match or to the KeyError/AmbigousNameError raised looking them up.
+    Scheduling a few outputs only resolves the formulas upstream of them.
+
+    Names are looked up in the tree and index the graph was built from, not
+    through the Teaml: copies share the graph, and whichever of them changes
+    its keys first drops it while the others keep using it.
+    """
+    def __init__(self, tea):
+        self.find = names(tea)
+        self.formulas = {}
+        self.bindings = LazyMap(self, 'bindings')
+        self.dependencies = LazyMap(self, 'dependencies')
+        # path -> seconds spent resolving its references
+        self.bind_times = {}
+        # path -> memoized steps of Teaml.trace
+        self.traces = {}
+        self._dependents = None
+        for path, formula in formula_paths(tea.tree):
+            self.formulas[path] = formula
+
+    def resolve(self, path):
+        """
+        Binds the references of the formula at `path`
+        """
+        start = perf_counter()
+        references = computer.parse(munge(self.formulas[path])).names
+        bindings = bind(self.find, references)
+        self.bind_times[path] = perf_counter() - start
+        refs = [ref for ref in bindings.values() if isinstance(ref, tuple)]
+        dict.__setitem__(self.bindings, path, bindings)
+        dict.__setitem__(self.dependencies, path, [ref for ref in refs if ref in self.formulas])
+
+    def resolve_parsable(self):
+        """
+        Binds every formula that parses, the others keep no bindings and
+        raise their SyntaxError when computed
+
+        Returns:
+            bool: True when every formula is bound
+        """
+        for path in self.formulas:
+            if path not in self.bindings:
+                try:
+                    self.resolve(path)
+                except (SyntaxError, ValueError):
+                    continue
+        if len(self.bindings) < len(self.formulas):
+            return False
+        self.find = None
+        return True
+
+    def resolve_all(self):
+        for path in self.formulas:
+            if path not in self.bindings:
+                self.resolve(path)
+        # Every lookup is done, the tree is no longer needed
+        self.find = None
+
+    @property
+    def dependents(self):
+        """
+        {path: [formula paths referencing it]}, resolves every formula that
+        parses
+        """
+        if self._dependents is None:
+            self.resolve_parsable()
+            dependents = {}
+            for path, bindings in dict.items(self.bindings):
+                for ref in bindings.values():
+                    if isinstance(ref, tuple):
+                        dependents.setdefault(ref, []).append(path)
+            self._dependents = dependents
+        return self._dependents
+
+    def updated(self, tea, path, formula):
+        """
+        A new graph with the formula at `path` replaced by `formula`
+
+        Resolutions of every other formula are shared with this graph,
+        which is left as it was for any copies still using it.
+
+        Returns:
+            DependencyGraph, or None when `path` gains or loses a formula
+            and the graph has to be rebuilt
+        """
+        if path not in self.formulas or formula is None:
+            return None
+        graph = DependencyGraph.__new__(DependencyGraph)
+        graph.find = names(tea)
+        graph.formulas = dict(self.formulas)
+        graph.formulas[path] = formula
+        graph.bindings = LazyMap(graph, 'bindings')
+        graph.dependencies = LazyMap(graph, 'dependencies')
+        for (copy, original) in ((graph.bindings, self.bindings), (graph.dependencies, self.dependencies)):
+            dict.update(copy, dict.items(original))
+            dict.pop(copy, path, None)
+        graph.bind_times = dict(self.bind_times)
+        graph.traces = {}
+        graph._dependents = None
+        if self._dependents is not None:
+            old, new = referenced(self, path), referenced(graph, path)
+            dependents = dict(self._dependents)
+            for ref in old - new:
+                dependents[ref] = [p for p in dependents[ref] if p != path]
+            for ref in new - old:
+                dependents[ref] = dependents.get(ref, []) + [path]
+            graph._dependents = dependents
+        return graph
+
+    def __getstate__(self):
+        self.resolve_parsable()
+        return self.__dict__
+
+    def __contains__(self, path):
+        return path in self.formulas
+
+    def __len__(self):
+        return len(self.formulas)
+
+    def schedule(self, roots=None):
+        """
+        Orders formula paths so each comes after everything it references
+
+        Args:
+            roots (list): paths to start from, defaults to every formula
+
+        Returns:
+            Schedule: `order` lists the paths to evaluate, `cycles` lists
+            groups of paths that reference each other
+        """
+        roots = list(self.formulas) if roots is None else roots
+        return strongly_connected(roots, self.dependencies)
+
+    def downstream(self, paths):
+        """
+        Returns every formula path that depends on `paths`, directly or not
+        """
+        found = set()
+        pending = list(paths)
+        while pending:
+            for dependent in self.dependents.get(pending.pop(), []):
+                if dependent not in found:
+                    found.add(dependent)
+                    pending.append(dependent)
+        return found
+
+def referenced(graph, path):
+    """
+    The paths the formula at `path` references, none if it doesn't parse
+    """
+    try:
+        bindings = graph.bindings[path]
+    except (SyntaxError, ValueError):
+        return set()
+    return set(ref for ref in bindings.values() if isinstance(ref, tuple))
+
+def names(tea):
+    """
+    `tea.find_container` over its current tree and index
+
+    Copies only write to containers they own, and a Teaml drops its graph
+    before changing keys in place, so the tree stays as it is now for as
+    long as the graph uses it.
+    """
+    return partial(find_container, tea.tree, index=tea.index)
+
+def bind(find, references):
+    """
+    Resolve reference names to paths
+
+    Base names that only prefix a dotted reference are dropped, as they are
+    when the formula's context is built.
+
+    Args:
+        find: returns the container of a name, like `Teaml.find_container`
+    """
+    bindings = {}
+    for name in filter_bases(dict.fromkeys(references)):
+        try:
+            bindings[name] = tuple(find(name).path)
+        except (KeyError, AmbigousNameError) as e:
+            bindings[name] = e
+    return bindings
+
+def formula_paths(root):
+    """
+    Yields (path, formula) for every formula in `root`
+    """
+    # Imported here, teaml.teaml imports this module
+    from teaml.teaml import walk
+    for (data, path) in walk(root):
+        if not isinstance(data, (str, Series)):
+            continue
+        node = Node.new(data)
+        if node.formula is not None:
+            yield tuple(path), node.formula
+
+class LazyMap(dict):
+    """
+    A DependencyGraph's per formula mapping, resolved on first access
+    """
+    def __init__(self, graph, name):
+        self.graph = graph
+        self.name = name
+
+    def __missing__(self, path):
+        if path not in self.graph.formulas:
+            raise KeyError(path)
+        self.graph.resolve(path)
+        return dict.__getitem__(self, path)
+
+    def __reduce__(self):
+        # What's resolved so far, items() would resolve everything
+        return (LazyMap, (self.graph, self.name), None, None, iter(dict.items(self)))
+
+    def get(self, path, default=None):
+        try:
+            return self[path]
+        except KeyError:
+            return default
+
+    def items(self):
+        self.graph.resolve_all()
+        return super().items()
+
+    def values(self):
+        self.graph.resolve_all()
+        return super().values()
+
+def strongly_connected(roots, dependencies):
+    """
+    Iterative Tarjan's algorithm over `dependencies`
+
+    Components come out dependencies first, which is the evaluation order.
+    Single paths that don't reference themselves are returned in `order`,
+    everything else is a cycle.
+    """
+    order = []
+    cycles = []
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+
+    def visit(path):
+        index[path] = low[path] = len(index)
+        stack.append(path)
+        on_stack.add(path)
+        return (path, iter(dependencies.get(path, [])))
+
+    for root in roots:
+        if root in index:
+            continue
+        work = [visit(root)]
+        while work:
+            path, children = work[-1]
+            for child in children:
+                if child not in index:
+                    work.append(visit(child))
+                    break
+                if child in on_stack:
+                    low[path] = min(low[path], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[path])
+                if low[path] != index[path]:
+                    continue
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == path:
+                        break
+                if len(component) > 1 or path in dependencies.get(path, []):
+                    cycles.append(component[::-1])
+                else:
+                    order.append(path)
+    return Schedule(order, cycles)
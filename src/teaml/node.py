@@ -1,10 +1,28 @@
+import json
+import re
 from collections import namedtuple
 from typing import List, Optional
 
 from teaml.nodepath import NodePath
+from teaml.series import Series
 from teaml.value.value import Value
 from teaml.utils import single_type, munge
-from teaml.formula.tea_parser import computer
+from teaml.formula.tea_parser import FormulaCache, computer
+from teaml.formula.vector import vector_types
+
+# Plain numbers as_num can convert without trying int() and float(). Up to
+# 15 digits an int is exactly a float, so as_num returns the int.
+INTEGER = re.compile(r'[+-]?[0-9]{1,15}')
+DECIMAL = re.compile(r'[+-]?(?:(?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?|[0-9]+[eE][+-]?[0-9]+)')
+# Anything else int() or float() could accept
+NUMERIC = re.compile(r'[\s\d_.eE+-]*|\s*[+-]?(?:inf|infinity|nan)\s*', re.IGNORECASE)
+# "NUM" or "NUM%"
+SCALAR = re.compile(r'(?P<number>[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?)(?P<percent>%*)')
+# Largest ints a bulk parsed range can hold, as_num makes bigger ones floats
+EXACT_INT = 2 ** 53
+# Longer strings, mostly long ranges, aren't memoized
+MEMO_LENGTH = 1024
+parsed_strings = FormulaCache(maxsize=4096)
 
 class Node:
     @property
@@ -48,7 +66,8 @@ class Node:
 
     @property
     def references(self):
-        return self.parser.names if self.parser is not None else []
+        parser = self.parser
+        return parser.names if parser is not None else []
 
     @property
     def name(self) -> Optional[str]:
@@ -117,23 +136,63 @@ Formula: {self.formula}
             print(f"Error: {repr(data)}")
             raise e
 
+def computed_node(formula, result, key=None, path=None):
+    """
+    Node for a formula and its computed result
+
+    Numbers and ranges are used directly, anything else goes through the
+    '={formula} ={result}' string it would be stored as.
+    """
+    if key is None and isinstance(path, list):
+        key = '.'.join(path)
+    node_type = {int: NodeInt, float: NodeFloat}.get(type(result))
+    if node_type is not None:
+        node = node_type(result)
+    elif isinstance(result, vector_types):
+        node = NodeRange(result)
+    else:
+        return Node.new(f'={formula} ={result}', key=key, path=path)
+    node._formula = '=' + formula
+    node.key = key
+    node.path = path
+    return node
+
+def _unknown(data):
+    raise ValueError(f'Unknown data type: {data}')
+
 def _new_node(data, key=None, path=None):
-    def fail(d):
-        raise ValueError(f'Unknown data type: {d}')
-    node = {
-        dict: NodeDict,
-        float: NodeFloat,
-        int: NodeInt,
-        list: NodeRange,
-        str: parse_string,
-        type(None): lambda _: NodeNone(),
-    }.get(type(data), fail)(data)
+    node = NODE_TYPES.get(type(data), _unknown)(data)
     node.key = key
     node.path = path
     return node
 
 def parse_string(string) -> Node:
+    """
+    Node for a string from the yaml, or a result stored as one
+
+    Strings are parsed once: later calls build a new node from the type,
+    value and attributes memoized for the same string.
+    """
+    if len(string) > MEMO_LENGTH:
+        return _parse(string)
+    node_type, value, attributes = parsed_strings.get(string, _memo)
+    node = node_type() if node_type is NodeNone else node_type(value)
+    for name, attribute in attributes.items():
+        setattr(node, name, list(attribute) if isinstance(attribute, list) else attribute)
+    return node
+
+def _memo(string):
+    node = _parse(string)
+    return type(node), node.value, dict(node.__dict__)
+
+def _parse(string) -> Node:
     string = string.strip()
+    match = SCALAR.fullmatch(string)
+    if match is not None:
+        num = as_num(match['number'])
+        if match['percent']:
+            return NodeFloat(num / 100.0)
+        return Node.new(num)
     if string.startswith('='):
         return parse_formula(string)
     if string.startswith('[') and string.endswith(']'):
@@ -177,7 +236,7 @@ def parse_formula(string) -> Node:
         if value.startswith('#'):
             node = NodeError(value)
         else:
-            node = parse_string(value)
+            node = _parse(value)
     else:
         node = NodeNone()
     # node = parse_string(parts[1].strip()) if len(parts) > 1 else NodeNone()
@@ -190,6 +249,13 @@ def as_num(value):
 
     If int() and float() are the same value, return an int
     """
+    if isinstance(value, str):
+        if INTEGER.fullmatch(value):
+            return int(value)
+        if DECIMAL.fullmatch(value):
+            return float(value)
+        if not NUMERIC.fullmatch(value):
+            return None
     int_value = None
     float_value = None
     try:
@@ -208,12 +274,35 @@ def as_num(value):
 
 def parse_range(string) -> Node:
     assert string.startswith('[') and string.endswith(']')
+    nums = bulk_numbers(string)
+    if nums is not None:
+        return NodeRange(nums)
     parts = string[1:-1].split(',')
     nums = [as_num(p) for p in parts]
     if single_type(nums) in (float, int):
         return NodeRange(nums)
     return NodeRange(parts)
 
+def bulk_numbers(string):
+    """
+    The numbers of a '[1, 2.5, ...]' range parsed in one go, as `as_num`
+    would parse them one by one
+
+    Returns:
+        list, or None when the range isn't only JSON numbers
+    """
+    try:
+        values = json.loads(string)
+    except (ValueError, RecursionError):
+        return None
+    for value in values:
+        if type(value) is int:
+            if not -EXACT_INT <= value <= EXACT_INT:
+                return None
+        elif type(value) is not float:
+            return None
+    return values or None
+
 class NodeInt(int, Node):
     @property
     def value(self):
@@ -234,6 +323,19 @@ class NodeRange(list, Node):
     def value(self):
         return self[:]
 
+class NodeSeries(Node):
+    """
+    A range in an external file, see `teaml.series`
+    """
+    def __init__(self, series):
+        self.series = series
+        if series.formula is not None:
+            self._formula = series.formula
+
+    @property
+    def value(self):
+        return self.series.vector
+
 class NodeString(str, Node):
     @property
     def value(self):
@@ -254,3 +356,13 @@ class NodeError(str, Node):
     @property
     def value(self):
         return str(self)
+
+NODE_TYPES = {
+    dict: NodeDict,
+    float: NodeFloat,
+    int: NodeInt,
+    list: NodeRange,
+    Series: NodeSeries,
+    str: parse_string,
+    type(None): lambda _: NodeNone(),
+}
@@ -0,0 +1,122 @@
+"""
+Evaluating scenarios across worker processes
+
+Each worker receives the model once, computes it, then evaluates chunks of
+overrides with a ScenarioRunner. Results come back in submission order.
+
+Batch entry point:
+
+    python -m teaml.parallel model.yaml --outputs IRR NPV < scenarios.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from teaml.scenario import ScenarioRunner
+
+# Set in each worker process by _start_worker
+_runner = None
+
+def _start_worker(root, outputs):
+    global _runner
+    from teaml.teaml import Teaml
+    _runner = ScenarioRunner(Teaml(root), outputs)
+
+def clean_root(tea):
+    """
+    `tea.root` without the stored results of dirty formulas
+
+    A worker's model has nothing marked dirty, so it would take those
+    results as computed rather than recompute them.
+    """
+    from teaml.teaml import fold_results
+    if not tea._dirty:
+        return tea.root
+    results = {path: result for path, result in tea.results.items() if path not in tea._dirty}
+    return fold_results(tea.tree, results)
+
+def _run_chunk(chunk):
+    return [_runner.run(overrides) for overrides in chunk]
+
+def chunked(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+class ParallelExecutor:
+    """
+    Process pool for evaluating scenarios
+
+    Args:
+        workers (int): number of processes, defaults to the CPU count
+        chunksize (int): scenarios sent to a worker at a time
+        backlog (int): chunks in flight per worker
+    """
+    def __init__(self, workers=None, chunksize=64, backlog=2):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.backlog = backlog
+
+    def run(self, tea, overrides, outputs):
+        """
+        Yields {output: value} for each of `overrides`, in order
+
+        `overrides` may be any iterable, it is consumed as workers free up.
+        """
+        outputs = list(outputs)
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_start_worker,
+            initargs=(clean_root(tea), outputs))
+        with pool:
+            pending = deque()
+            for chunk in chunked(overrides, self.chunksize):
+                pending.append(pool.submit(_run_chunk, chunk))
+                if len(pending) >= self.workers * self.backlog:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+def jsonable(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+def main(argv=None):
+    # Imported here so workers don't need the CLI dependencies
+    from teaml.teaml import Teaml
+    parser = argparse.ArgumentParser(
+        prog='python -m teaml.parallel',
+        description='Evaluate JSON lines of {input: value} overrides against a TEAml model')
+    parser.add_argument('model', help='TEAml yaml file')
+    parser.add_argument('--outputs', nargs='+', required=True, help='names of values to report')
+    parser.add_argument('--scenarios', default='-', help='JSON lines file of overrides, default stdin')
+    parser.add_argument('--results', default='-', help='JSON lines file to write, default stdout')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, default CPU count')
+    parser.add_argument('--chunksize', type=int, default=64, help='scenarios per task')
+    args = parser.parse_args(argv)
+
+    tea = Teaml.load(args.model)
+    source = sys.stdin if args.scenarios == '-' else open(args.scenarios, encoding='utf-8')
+    target = sys.stdout if args.results == '-' else open(args.results, 'w', encoding='utf-8')
+    try:
+        overrides = (json.loads(line) for line in source if line.strip())
+        executor = ParallelExecutor(workers=args.workers, chunksize=args.chunksize)
+        for result in executor.run(tea, overrides, args.outputs):
+            target.write(json.dumps(result, default=jsonable) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+if __name__ == '__main__':
+    main()
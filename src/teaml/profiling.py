@@ -0,0 +1,100 @@
+"""
+Per formula timing of a Teaml's computation
+
+Hooks are called around each formula's evaluation:
+
+    class Telemetry(ComputeHook):
+        def after(self, tea, path, result, timings):
+            send('teaml.compute', '.'.join(path), timings['compute'])
+
+    tea.hooks.append(Telemetry())
+
+A Profiler is a hook that totals the timings per formula:
+
+    with tea.profile() as profiler:
+        tea.compute()
+    for row in profiler.report()[:10]:
+        print(row)
+"""
+
+from collections import namedtuple
+
+from teaml.formula.tea_parser import iserror
+from teaml.formula.vector import vector_types
+from teaml.utils import munge
+
+NodeProfile = namedtuple('NodeProfile', ['key', 'evaluations', 'compute', 'context', 'bind', 'size', 'error'])
+NodeProfile.__doc__ = """
+Totals for one formula
+
+Times are in seconds: `compute` in the Computer, `context` collecting the
+values of its references, and `bind` resolving its reference names when the
+dependency graph was built. `size` is the number of values in the last
+result and `error` is the last result when it was an error, otherwise None.
+"""
+
+class ComputeHook:
+    """
+    Called around each formula a Teaml evaluates
+
+    Add instances to `Teaml.hooks`, copies of the Teaml keep them.
+    """
+    def before(self, tea, path):
+        pass
+
+    def after(self, tea, path, result, timings):
+        """
+        Args:
+            tea (Teaml): the model being computed
+            path (tuple): the formula's path
+            result: the computed value
+            timings (dict): seconds spent on 'context' and 'compute'
+        """
+        pass
+
+class Profiler(ComputeHook):
+    """
+    Totals compute timings per formula of a Teaml
+
+    Used as a context manager it adds itself to the Teaml's hooks on entry
+    and removes itself on exit.
+    """
+    def __init__(self, tea):
+        self.tea = tea
+        self.stats = {}
+
+    def __enter__(self):
+        self.tea.hooks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.tea.hooks.remove(self)
+
+    def after(self, tea, path, result, timings):
+        stats = self.stats.get(path)
+        if stats is None:
+            stats = self.stats[path] = {'evaluations': 0, 'compute': 0.0, 'context': 0.0}
+        stats['evaluations'] += 1
+        stats['compute'] += timings['compute']
+        stats['context'] += timings['context']
+        stats['size'] = len(result) if isinstance(result, vector_types) else 1
+        stats['error'] = result if iserror(result) else None
+
+    def report(self, sort='compute'):
+        """
+        Returns a list of NodeProfile, largest `sort` field first
+        """
+        bind_times = self.tea.graph.bind_times
+        rows = [
+            NodeProfile(
+                key=munge(list(path)),
+                evaluations=stats['evaluations'],
+                compute=stats['compute'],
+                context=stats['context'],
+                bind=bind_times.get(path, 0.0),
+                size=stats['size'],
+                error=stats['error'])
+            for path, stats in self.stats.items()]
+        if sort == 'key':
+            return sorted(rows, key=lambda row: row.key)
+        return sorted(rows, key=lambda row: getattr(row, sort), reverse=True)
@@ -0,0 +1,88 @@
+"""
+Computed results shared between copies of a Teaml
+"""
+
+from collections import ChainMap
+
+class Removed:
+    """
+    Marks a result removed in a copy while the layers below still have it
+    """
+    def __reduce__(self):
+        return 'REMOVED'
+
+    def __repr__(self):
+        return 'REMOVED'
+
+REMOVED = Removed()
+
+class Results(ChainMap):
+    """
+    {path: computed value}, layered over the results of the Teaml copied from
+
+    `fork` gives each side a new front dict and shares everything below it,
+    so copying costs the same however many results there are, and a copy
+    holds only what it computes or removes itself.
+    """
+    # Layers are merged once a chain of copies gets this deep
+    MAX_LAYERS = 8
+
+    def __getitem__(self, key):
+        for mapping in self.maps:
+            if key in mapping:
+                value = mapping[key]
+                if value is REMOVED:
+                    break
+                return value
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        for mapping in self.maps:
+            if key in mapping:
+                return mapping[key] is not REMOVED
+        return False
+
+    def __iter__(self):
+        merged = {}
+        for mapping in reversed(self.maps):
+            merged.update(mapping)
+        return iter([key for key, value in merged.items() if value is not REMOVED])
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __bool__(self):
+        return any(True for _ in self)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if len(self.maps) == 1:
+            del self.maps[0][key]
+        else:
+            self.maps[0][key] = REMOVED
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def fork(self):
+        """
+        A copy of these results, after which neither writes to a shared dict
+        """
+        if len(self.maps) > self.MAX_LAYERS:
+            self.maps = [{}, {key: self[key] for key in self}]
+        elif self.maps[0]:
+            self.maps = [{}] + self.maps
+        return Results({}, *self.maps[1:])
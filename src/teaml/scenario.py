@@ -0,0 +1,58 @@
+"""
+Evaluating many input scenarios against one model
+"""
+
+from itertools import product
+
+class ScenarioRunner:
+    """
+    Evaluates input overrides against a single computed copy of a model
+
+    Each run puts back the previous run's overrides that it doesn't set
+    itself, so only formulas downstream of the swept inputs are recomputed.
+    """
+    def __init__(self, tea, outputs):
+        self.tea = tea.copy()
+        self.tea.compute()
+        self.outputs = list(outputs)
+        self.originals = {}
+
+    def run(self, overrides):
+        """
+        Returns {output: value} with `overrides` applied to the base model
+        """
+        for key in list(self.originals):
+            if key not in overrides:
+                self.tea[key] = self.originals.pop(key)
+        for key, value in overrides.items():
+            if key not in self.originals:
+                self.originals[key] = self.original(key)
+            self.tea[key] = value
+        return {name: self.tea.get_value(name) for name in self.outputs}
+
+    def original(self, key):
+        """
+        The model's entry for `key`, formulas without their results
+
+        A result may be stale by the time it's put back, formulas are
+        computed again instead.
+        """
+        # Imported here, teaml.teaml imports this module
+        from teaml.teaml import reset_value_transformer, transform
+        return transform(self.tea.find_container(key).value, reset_value_transformer)
+
+def scenarios(inputs, grid=True):
+    """
+    Expands {input: [values]} into a list of {input: value} overrides
+
+    With `grid` every combination is used, otherwise the value lists are
+    zipped together and must all be the same length.
+    """
+    names = list(inputs)
+    values = [list(v) for v in inputs.values()]
+    if grid:
+        return [dict(zip(names, row)) for row in product(*values)]
+    lengths = set(len(v) for v in values)
+    if len(lengths) > 1:
+        raise ValueError(f"Unequal lengths: {[len(v) for v in values]}")
+    return [dict(zip(names, row)) for row in zip(*values)]
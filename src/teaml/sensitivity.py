@@ -0,0 +1,181 @@
+"""
+Derivatives of a Teaml's outputs with respect to its inputs
+
+Inputs are seeded with Dual numbers, each carrying a derivative of 1 for
+itself, and the formulas upstream of the outputs are evaluated once in
+order. Every Dual then holds its partial derivatives for all of the inputs.
+
+A formula whose result loses the Duals of its references, such as one
+calling pyxirr's irr or npv, is differentiated by central differences of
+that formula alone, moving its references along each input's derivatives.
+"""
+
+from teaml.codegen import evaluate
+from teaml.container import AmbigousNameError
+from teaml.formula.dual import Dual, carries_dual
+from teaml.formula.vector import vector, vector_types
+from teaml.utils import munge
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def is_numeric(value):
+    if isinstance(value, vector_types):
+        return len(value) > 0 and all(is_number(v) for v in value)
+    return is_number(value)
+
+def seed(value, name):
+    """
+    `value` with a derivative of 1 for `name`, per element for vectors
+    """
+    if isinstance(value, vector_types):
+        return vector([Dual(v, {name: 1.0}) for v in value])
+    return Dual(value, {name: 1.0})
+
+def gradient(value, inputs):
+    """
+    {input: derivative} from a Dual, a list per input for vectors
+    """
+    if isinstance(value, vector_types):
+        return {name: [v.grad.get(name, 0.0) if isinstance(v, Dual) else 0.0 for v in value] for name in inputs}
+    if isinstance(value, Dual):
+        return {name: value.grad.get(name, 0.0) for name in inputs}
+    if is_number(value):
+        return {name: 0.0 for name in inputs}
+    return {name: None for name in inputs}
+
+def directions(values):
+    """
+    The inputs any of `values` has derivatives for
+    """
+    found = {}
+    for value in values:
+        items = value if isinstance(value, vector_types) else [value]
+        for item in items:
+            if isinstance(item, Dual):
+                found.update(dict.fromkeys(item.grad))
+    return list(found)
+
+def shifted(plain, dual, name, t):
+    """
+    `plain` moved by `t` along the derivatives of `dual` for `name`
+    """
+    if isinstance(dual, Dual):
+        return plain + t * dual.grad.get(name, 0.0)
+    if isinstance(dual, vector_types) and isinstance(plain, vector_types):
+        return vector([shifted(p, d, name, t) for p, d in zip(plain, dual)])
+    return plain
+
+class Sensitivities:
+    """
+    One dual number evaluation of the formulas upstream of `outputs`
+
+    Args:
+        tea (Teaml): the model, left unchanged
+        outputs (list): names to differentiate
+        inputs (list): names to differentiate with respect to, defaults to
+            every numeric value the outputs depend on
+        step (float): relative step for formulas differentiated numerically
+    """
+    def __init__(self, tea, outputs, inputs=None, step=1e-6):
+        self.base = tea.copy()
+        self.outputs = list(outputs)
+        self.base.compute(outputs=self.outputs)
+        self.step = step
+        graph = self.base.graph
+        self.output_paths = [tuple(self.base.find_container(name).path) for name in self.outputs]
+        self.schedule = graph.schedule([p for p in self.output_paths if p in graph])
+        if inputs is None:
+            inputs = self.default_inputs()
+        self.seeds = {}
+        self.scales = {}
+        for name in inputs:
+            path = tuple(self.base.find_container(name).path)
+            value = self.base.value_at(path)
+            if not is_numeric(value):
+                raise ValueError(f"Not a number: {name}={value}")
+            self.seeds[path] = seed(value, name)
+            magnitude = [abs(v) for v in value] if isinstance(value, vector_types) else [abs(value)]
+            self.scales[name] = max(1.0, sum(magnitude) / len(magnitude))
+        self.inputs = list(inputs)
+        self.duals = {}
+        self.evaluate()
+
+    def default_inputs(self):
+        graph = self.base.graph
+        found = {}
+        for path in self.schedule.order:
+            for ref in graph.bindings[path].values():
+                if isinstance(ref, tuple) and ref not in graph and is_numeric(self.base.value_at(ref)):
+                    found[ref] = munge('.'.join(ref))
+        return list(found.values())
+
+    def value_at(self, path):
+        if path in self.duals:
+            return self.duals[path]
+        if path in self.seeds:
+            return self.seeds[path]
+        return self.base.value_at(path)
+
+    def context(self, bindings, values):
+        context = {}
+        for name, ref in bindings.items():
+            if isinstance(ref, KeyError):
+                context[name] = f'#error(Key:{name})'
+            elif isinstance(ref, AmbigousNameError):
+                context[name] = f'#error(Ambigous:{ref})'
+            else:
+                context[name] = values(ref)
+        return context
+
+    def evaluate(self):
+        graph = self.base.graph
+        for path in self.schedule.order:
+            if path in self.seeds:
+                continue
+            formula = munge(graph.formulas[path])
+            bindings = graph.bindings[path]
+            context = self.context(bindings, self.value_at)
+            if not any(carries_dual(v) for v in context.values()):
+                # Not downstream of an input, the computed value stands
+                continue
+            result = evaluate(formula, dict(context))
+            if not carries_dual(result):
+                result = self.numeric(path, formula, bindings, context)
+            self.duals[path] = result
+
+    def numeric(self, path, formula, bindings, context):
+        """
+        Central differences of one formula along each input's direction
+        """
+        plain = self.context(bindings, self.base.value_at)
+        base = self.base.value_at(path)
+        if not is_numeric(base):
+            return base
+        grads = [{} for _ in base] if isinstance(base, vector_types) else {}
+        for name in directions(context.values()):
+            t = self.step * self.scales.get(name, 1.0)
+            up = evaluate(formula, {k: shifted(plain[k], context[k], name, t) for k in plain})
+            down = evaluate(formula, {k: shifted(plain[k], context[k], name, -t) for k in plain})
+            if not (is_numeric(up) and is_numeric(down)):
+                continue
+            if isinstance(base, vector_types):
+                for i, (u, d) in enumerate(zip(up, down)):
+                    grads[i][name] = (u - d) / (2 * t)
+            else:
+                grads[name] = (up - down) / (2 * t)
+        if isinstance(base, vector_types):
+            return vector([Dual(v, g) for v, g in zip(base, grads)])
+        return Dual(base, grads)
+
+    def report(self):
+        """
+        {output: {input: derivative}}
+
+        Vector outputs and inputs give a list per input, the derivative of
+        each element for a shift of every element of the input. Outputs
+        that aren't numbers give None.
+        """
+        return {
+            name: gradient(self.value_at(path), self.inputs)
+            for name, path in zip(self.outputs, self.output_paths)}
@@ -0,0 +1,143 @@
+"""
+Ranges stored outside the yaml, in binary array files
+
+    Hourly Irradiance: !series irradiance.npy
+    Hourly Output: !series {formula: =Capacity * Hourly Irradiance, path: output.npy}
+
+`.npy` files are memory mapped with NumPy, any other file is read as raw
+little endian float64. The file is only opened when the value is first
+used, and copies of a model share the mapping. Relative paths are from the
+yaml file's directory, or the working directory for `loads`.
+"""
+
+import os
+import sys
+from array import array
+
+import yaml
+
+from teaml.formula.vector import ArrayVector, Vector
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TAG = '!series'
+
+class Series:
+    """
+    A reference to a range in a binary file
+
+    Args:
+        path (str): the file, as written in the yaml
+        directory (str): what a relative `path` is relative to
+        formula (str): '=...' when the range is a computed result
+    """
+    def __init__(self, path, directory=None, formula=None):
+        self.path = path
+        self.directory = directory
+        self.formula = formula
+        self._vector = None
+
+    @property
+    def file(self):
+        if self.directory is None or os.path.isabs(self.path):
+            return self.path
+        return os.path.join(self.directory, self.path)
+
+    @property
+    def vector(self):
+        """
+        The range, a read-only view of the mapped file with NumPy
+        """
+        if self._vector is None:
+            self._vector = read(self.file)
+        return self._vector
+
+    def __len__(self):
+        return len(self.vector)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        # Read-only, copies can share the mapping
+        return self
+
+    def __reduce__(self):
+        return (Series, (self.path, self.directory, self.formula))
+
+    def __eq__(self, other):
+        return (isinstance(other, Series) and self.file == other.file
+            and self.formula == other.formula)
+
+    def __hash__(self):
+        return hash((self.file, self.formula))
+
+    def __repr__(self):
+        formula = f', formula={self.formula!r}' if self.formula else ''
+        return f'Series({self.path!r}{formula})'
+
+def read(filename):
+    """
+    The values in `filename` as a vector, without copying them when NumPy
+    is available
+    """
+    if filename.endswith('.npy'):
+        if numpy is None:
+            raise ImportError("NumPy is required to read .npy series")
+        data = numpy.load(filename, mmap_mode='r')
+    elif numpy is not None:
+        data = numpy.memmap(filename, dtype='<f8', mode='r')
+    else:
+        values = array('d')
+        with open(filename, 'rb') as f:
+            values.frombytes(f.read())
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return Vector(values.tolist())
+    if data.ndim != 1 or data.dtype.kind not in 'if':
+        raise ValueError(f"Not a 1-D numeric array: {filename}")
+    return data.view(ArrayVector)
+
+def write(filename, values):
+    """
+    Writes `values` to `filename`, as .npy or raw float64 by extension
+    """
+    if filename.endswith('.npy'):
+        if numpy is None:
+            raise ImportError("NumPy is required to write .npy series")
+        numpy.save(filename, numpy.asarray(values))
+        return
+    data = array('d', values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    with open(filename, 'wb') as f:
+        data.tofile(f)
+
+def loader(base, directory=None):
+    """
+    Subclass of yaml Loader `base` that reads `!series` tags
+    """
+    def construct(loader, node):
+        if isinstance(node, yaml.MappingNode):
+            fields = loader.construct_mapping(node)
+            return Series(fields['path'], directory, fields.get('formula'))
+        return Series(loader.construct_scalar(node), directory)
+
+    cls = type('SeriesLoader', (base,), {})
+    cls.add_constructor(TAG, construct)
+    return cls
+
+def represent(dumper, series):
+    if series.formula:
+        return dumper.represent_mapping(TAG, {'formula': series.formula, 'path': series.path})
+    return dumper.represent_scalar(TAG, series.path)
+
+def rebased(series, directory):
+    """
+    `series` with its path relative to `directory`
+    """
+    path = os.path.relpath(os.path.abspath(series.file), os.path.abspath(directory))
+    return Series(path, directory, series.formula)
@@ -0,0 +1,393 @@
+"""
+Monte Carlo simulation of a Teaml
+
+Each input with a distribution becomes an array of samples, and the
+formulas downstream of them are evaluated once over those arrays:
+
+    from teaml.simulate import Normal, Triangular
+    summary = tea.simulate({
+        'SolarCapacityFactor': Normal(0.25, 0.02),
+        'Inflation': Triangular(0.02, 0.025, 0.04),
+    }, n=100_000, outputs=['IRR', 'NPV'], seed=1)
+    summary['IRR']['p50']
+
+Samples keep the sample axis first: a number becomes shape (n,), a range
+of k values shape (n, k). irr and npv of every sample are found together
+by `teaml.formula.finance`; other sandbox functions that can't take
+arrays, such as roundup, are called once per sample.
+
+Requires NumPy.
+"""
+
+import builtins
+import copy
+import math
+from abc import ABC, abstractmethod
+
+from teaml.codegen import evaluate
+from teaml.container import AmbigousNameError
+from teaml.formula import finance
+from teaml.formula.tea_parser import computer
+from teaml.formula.vector import defer_to, vector_classes, vector_types
+from teaml.utils import munge
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PERCENTILES = (5, 10, 50, 90, 95)
+
+class Distribution(ABC):
+    @abstractmethod
+    def sample(self, rng, n):
+        """
+        `n` draws from numpy Generator `rng`
+        """
+
+class Normal(Distribution):
+    def __init__(self, mean, sd):
+        self.mean = mean
+        self.sd = sd
+
+    def sample(self, rng, n):
+        return rng.normal(self.mean, self.sd, n)
+
+class Uniform(Distribution):
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def sample(self, rng, n):
+        return rng.uniform(self.low, self.high, n)
+
+class Triangular(Distribution):
+    def __init__(self, low, mode, high):
+        self.low = low
+        self.mode = mode
+        self.high = high
+
+    def sample(self, rng, n):
+        return rng.triangular(self.low, self.mode, self.high, n)
+
+class LogNormal(Distribution):
+    """
+    exp of a Normal(mu, sigma)
+    """
+    def __init__(self, mu, sigma):
+        self.mu = mu
+        self.sigma = sigma
+
+    def sample(self, rng, n):
+        return rng.lognormal(self.mu, self.sigma, n)
+
+def require_numpy():
+    if numpy is None:
+        raise ImportError("NumPy is required for simulation")
+
+def is_samples(value):
+    return numpy is not None and isinstance(value, Samples)
+
+def broadcast(*values):
+    """
+    Plain ndarrays of `values` with their sample axes lined up
+
+    Returns None if a value isn't a number, range or Samples.
+    """
+    arrays = []
+    for value in values:
+        if isinstance(value, Samples):
+            arrays.append(value.view(numpy.ndarray))
+        elif isinstance(value, vector_classes) or isinstance(value, list):
+            arrays.append(numpy.asarray(list(value), dtype=float))
+        elif isinstance(value, (int, float, bool)):
+            arrays.append(value)
+        else:
+            return None
+    ranged = any(
+        (isinstance(v, Samples) and v.ndim == 2) or isinstance(v, vector_classes) or isinstance(v, list)
+        for v in values)
+    if ranged:
+        # Numbers per sample become a column, to spread across the range
+        arrays = [a[:, None] if isinstance(v, Samples) and v.ndim == 1 else a for a, v in zip(arrays, values)]
+    return arrays
+
+if numpy is not None:
+    class Samples(numpy.ndarray):
+        """
+        Values of a formula across simulation samples, sample axis first
+
+        Arithmetic follows Vector, spread over the samples. Iterating,
+        indexing and len() address the range axis of (n, k) samples, so
+        `sum(Annual.Revenue)` adds up each sample's range.
+        """
+        def _op(self, other, ufunc, reflected=False):
+            arrays = broadcast(self, other)
+            if arrays is None:
+                return NotImplemented
+            a, b = arrays
+            result = ufunc(b, a) if reflected else ufunc(a, b)
+            return result.view(Samples)
+
+        def __add__(self, other):
+            return self._op(other, numpy.add)
+
+        def __radd__(self, other):
+            return self._op(other, numpy.add, reflected=True)
+
+        def __sub__(self, other):
+            return self._op(other, numpy.subtract)
+
+        def __rsub__(self, other):
+            return self._op(other, numpy.subtract, reflected=True)
+
+        def __mul__(self, other):
+            return self._op(other, numpy.multiply)
+
+        def __rmul__(self, other):
+            return self._op(other, numpy.multiply, reflected=True)
+
+        def __truediv__(self, other):
+            return self._op(other, numpy.true_divide)
+
+        def __rtruediv__(self, other):
+            return self._op(other, numpy.true_divide, reflected=True)
+
+        def __pow__(self, other):
+            return self._op(other, numpy.power)
+
+        def __rpow__(self, other):
+            return self._op(other, numpy.power, reflected=True)
+
+        def __lt__(self, other):
+            return self._op(other, numpy.less)
+
+        def __le__(self, other):
+            return self._op(other, numpy.less_equal)
+
+        def __gt__(self, other):
+            return self._op(other, numpy.greater)
+
+        def __ge__(self, other):
+            return self._op(other, numpy.greater_equal)
+
+        def __eq__(self, other):
+            return self._op(other, numpy.equal)
+
+        def __ne__(self, other):
+            return self._op(other, numpy.not_equal)
+
+        __hash__ = None
+
+        def __neg__(self):
+            return numpy.negative(self.view(numpy.ndarray)).view(Samples)
+
+        def __abs__(self):
+            return numpy.abs(self.view(numpy.ndarray)).view(Samples)
+
+        def __len__(self):
+            return self.shape[-1]
+
+        def __iter__(self):
+            array = self.view(numpy.ndarray)
+            if array.ndim == 1:
+                raise TypeError("samples of a number are not iterable")
+            return (array[:, i].view(Samples) for i in range(array.shape[1]))
+
+        def __getitem__(self, index):
+            array = self.view(numpy.ndarray)
+            if array.ndim == 1:
+                raise TypeError("samples of a number are not subscriptable")
+            return array[:, index].view(Samples)
+
+        def __repr__(self):
+            return f'Samples({self.view(numpy.ndarray)!r})'
+
+        def __str__(self):
+            return str(self.view(numpy.ndarray))
+
+    defer_to(Samples)
+else:
+    Samples = None
+
+def sample_count(values):
+    for value in values:
+        if is_samples(value):
+            return value.shape[0]
+    return None
+
+def sample_row(value, i):
+    if not is_samples(value):
+        return value
+    row = value.view(numpy.ndarray)[i]
+    return row.tolist()
+
+def from_rows(rows):
+    return numpy.asarray(rows, dtype=float).view(Samples)
+
+def lift(fn):
+    """
+    `fn` called once per sample when given Samples
+
+    Samples that fail give NaN rather than failing every sample.
+    """
+    def lifted(*args):
+        n = sample_count(args)
+        if n is None:
+            return fn(*args)
+        rows = []
+        for i in range(n):
+            try:
+                rows.append(fn(*[sample_row(a, i) for a in args]))
+            except Exception:
+                rows.append(math.nan)
+        return from_rows(rows)
+    return lifted
+
+def sample_if(condition, true_value, false_value):
+    if not is_samples(condition):
+        return true_value if condition else false_value
+    arrays = broadcast(condition, true_value, false_value)
+    if arrays is None:
+        return lift(lambda c, t, f: t if c else f)(condition, true_value, false_value)
+    return numpy.where(*arrays).view(Samples)
+
+def sample_sum(values, start=0):
+    if is_samples(values) and values.ndim == 2:
+        return (values.view(numpy.ndarray).sum(axis=1) + start).view(Samples)
+    return builtins.sum(values, start)
+
+def reduce(fn, ufunc):
+    def reduced(*args):
+        if len(args) == 1 and is_samples(args[0]) and args[0].ndim == 2:
+            return ufunc.reduce(args[0].view(numpy.ndarray), axis=1).view(Samples)
+        if any(is_samples(a) for a in args):
+            arrays = broadcast(*args)
+            if arrays is not None:
+                return ufunc.reduce(numpy.broadcast_arrays(*arrays)).view(Samples)
+        return fn(*args)
+    return reduced
+
+def sample_irr(values, guess=0.1):
+    if is_samples(values) and values.ndim == 2 and not is_samples(guess):
+        return from_rows(finance.irr(values.view(numpy.ndarray), guess))
+    return lift(computer.sandbox['irr'])(values, guess)
+
+def sample_npv(rate, values, start_from_zero=True):
+    if is_samples(rate) or (is_samples(values) and values.ndim == 2):
+        rates = rate.view(numpy.ndarray) if is_samples(rate) else rate
+        if is_samples(values):
+            flows = values.view(numpy.ndarray)
+        else:
+            flows = numpy.asarray(list(values), dtype=float)
+        if flows.ndim == 1:
+            flows = flows[None, :]
+        return from_rows(finance.npv(rates, flows, start_from_zero))
+    return lift(computer.sandbox['npv'])(rate, values, start_from_zero)
+
+def sample_computer():
+    """
+    A Computer sharing the formula cache, with a sandbox for Samples
+    """
+    simulating = copy.copy(computer)
+    sandbox = {name: lift(fn) for name, fn in computer.sandbox.items()}
+    sandbox.update({
+        'IF': sample_if,
+        'sum': sample_sum,
+        'max': reduce(builtins.max, numpy.maximum),
+        'min': reduce(builtins.min, numpy.minimum),
+        'round': lift(builtins.round),
+        'irr': sample_irr,
+        'npv': sample_npv,
+    })
+    simulating.sandbox = sandbox
+    return simulating
+
+def summarize(values, percentiles=PERCENTILES):
+    """
+    mean, sd, min, max, failed and 'p{n}' percentiles of an output
+
+    Statistics are lists for ranges, one per element. NaN samples are
+    counted in `failed` and left out.
+    """
+    if not isinstance(values, numpy.ndarray):
+        if isinstance(values, vector_types):
+            values = [list(values)]
+        elif isinstance(values, (int, float)):
+            values = [values]
+        else:
+            return {'error': values}
+    array = numpy.asarray(values, dtype=float)
+    finite = ~numpy.isnan(array)
+    with numpy.errstate(all='ignore'):
+        summary = {
+            'mean': numpy.nanmean(array, axis=0),
+            'sd': numpy.nanstd(array, axis=0),
+            'min': numpy.nanmin(array, axis=0),
+            'max': numpy.nanmax(array, axis=0),
+            'failed': (~finite).sum(axis=0) if array.ndim == 1 else (~finite).all(axis=1).sum(),
+        }
+        for p in percentiles:
+            summary[f'p{p:g}'] = numpy.nanpercentile(array, p, axis=0)
+    return {k: v.tolist() if isinstance(v, numpy.ndarray) else v.item() for k, v in summary.items()}
+
+class Simulation:
+    """
+    Samples of `outputs` given input distributions
+
+    Args:
+        tea (Teaml): the model, left unchanged
+        distributions (dict): {input: Distribution}
+        n (int): number of samples
+        outputs (list): names of the values to simulate
+        seed: for numpy.random.default_rng, for reproducible samples
+
+    Attributes:
+        samples (dict): {output: ndarray, or the computed value when no
+            distribution reaches the output}
+    """
+    def __init__(self, tea, distributions, n, outputs, seed=None):
+        require_numpy()
+        self.outputs = list(outputs)
+        base = tea.copy()
+        base.compute(outputs=self.outputs)
+        graph = base.graph
+        rng = numpy.random.default_rng(seed)
+        values = {}
+        for name, distribution in distributions.items():
+            path = tuple(base.find_container(name).path)
+            values[path] = numpy.asarray(distribution.sample(rng, n), dtype=float).view(Samples)
+        output_paths = [tuple(base.find_container(name).path) for name in self.outputs]
+        schedule = graph.schedule([path for path in output_paths if path in graph])
+        simulating = sample_computer()
+
+        def value_at(path):
+            return values[path] if path in values else base.value_at(path)
+
+        with numpy.errstate(all='ignore'):
+            for path in schedule.order:
+                if path in values:
+                    continue
+                context = {}
+                for name, ref in graph.bindings[path].items():
+                    if isinstance(ref, KeyError):
+                        context[name] = f'#error(Key:{name})'
+                    elif isinstance(ref, AmbigousNameError):
+                        context[name] = f'#error(Ambigous:{ref})'
+                    else:
+                        context[name] = value_at(ref)
+                if not any(is_samples(v) for v in context.values()):
+                    # Not downstream of a distribution, the computed value stands
+                    continue
+                values[path] = evaluate(munge(graph.formulas[path]), context, computer=simulating)
+
+        self.samples = {}
+        for name, path in zip(self.outputs, output_paths):
+            value = value_at(path)
+            self.samples[name] = value.view(numpy.ndarray) if is_samples(value) else value
+
+    def summary(self, percentiles=PERCENTILES):
+        """
+        {output: statistics}, see `summarize`
+        """
+        return {name: summarize(value, percentiles) for name, value in self.samples.items()}
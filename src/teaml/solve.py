@@ -0,0 +1,225 @@
+"""
+Finding input values that give target outputs
+
+Solvers evaluate the model through a ScenarioRunner, so each iteration only
+recomputes the formulas downstream of the inputs being varied.
+"""
+
+import sys
+from collections import namedtuple
+
+from teaml.scenario import ScenarioRunner
+
+EPSILON = sys.float_info.epsilon
+
+Solution = namedtuple('Solution', ['inputs', 'outputs', 'iterations', 'converged'])
+Solution.__doc__ = """
+Result of a solve
+
+`inputs` and `outputs` are {name: value} at the solution, `iterations`
+counts solver steps and `converged` is False if `maxiter` ran out first.
+"""
+
+def number(name, value, inputs):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        at = ', '.join(f'{k}={v}' for k, v in inputs.items())
+        raise ValueError(f"{name} is {value!r} at {at}")
+    return value
+
+def brent(f, a, b, fa=None, fb=None, xtol=1e-12, maxiter=100):
+    """
+    Brent's method for a root of `f` between `a` and `b`
+
+    Returns:
+        tuple: (root, iterations, converged)
+    """
+    fa = f(a) if fa is None else fa
+    fb = f(b) if fb is None else fb
+    if fa == 0:
+        return a, 0, True
+    if fb == 0:
+        return b, 0, True
+    if (fa > 0) == (fb > 0):
+        raise ValueError(f"Not bracketed: f({a})={fa}, f({b})={fb}")
+    c, fc = a, fa
+    d = e = b - a
+    for i in range(1, maxiter + 1):
+        if (fb > 0) == (fc > 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol = 2 * EPSILON * abs(b) + 0.5 * xtol
+        m = 0.5 * (c - b)
+        if abs(m) <= tol or fb == 0:
+            return b, i, True
+        if abs(e) < tol or abs(fa) <= abs(fb):
+            d = e = m
+        else:
+            # Secant, or inverse quadratic interpolation
+            s = fb / fa
+            if a == c:
+                p = 2 * m * s
+                q = 1 - s
+            else:
+                q = fa / fc
+                r = fb / fc
+                p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            else:
+                p = -p
+            if 2 * p < min(3 * m * q - abs(tol * q), abs(e * q)):
+                e = d
+                d = p / q
+            else:
+                d = e = m
+        a, fa = b, fb
+        b += d if abs(d) > tol else (tol if m > 0 else -tol)
+        fb = f(b)
+    return b, maxiter, False
+
+def bracket(f, x, maxiter=60):
+    """
+    Expands outwards from `x` until `f` changes sign
+
+    The search doesn't cross zero, inputs keep their sign. Points where `f`
+    raises ValueError, such as an IRR that doesn't exist, are skipped.
+
+    Returns:
+        tuple: (a, b, f(a), f(b))
+    """
+    fx = f(x)
+    if fx == 0:
+        return x, x, fx, fx
+    step = max(abs(x) * 0.1, 1e-3)
+    for _ in range(maxiter):
+        low = x - step if x <= 0 else max(x - step, 0.0)
+        high = x + step if x >= 0 else min(x + step, 0.0)
+        for y in dict.fromkeys((low, high)):
+            if y == x:
+                continue
+            try:
+                fy = f(y)
+            except ValueError:
+                continue
+            if (fy > 0) != (fx > 0) or fy == 0:
+                return (y, x, fy, fx) if y < x else (x, y, fx, fy)
+        step *= 2
+    raise ValueError(f"No sign change found around {x}")
+
+def goal_seek(tea, target, value, vary, bounds=None, xtol=1e-12, maxiter=100):
+    """
+    The value of input `vary` that makes output `target` equal `value`
+
+    Args:
+        tea (Teaml): the model, left unchanged
+        target (str): name of the output
+        value (float): value wanted for the output
+        vary (str): name of the input to change
+        bounds (tuple): (low, high) bracketing the solution, otherwise it
+            is searched for outwards from the input's current value
+        xtol (float): absolute tolerance on the input
+        maxiter (int): most iterations of Brent's method
+
+    Returns:
+        Solution
+    """
+    runner = ScenarioRunner(tea, [target])
+
+    def f(x):
+        inputs = {vary: x}
+        return number(target, runner.run(inputs)[target], inputs) - value
+
+    if bounds is None:
+        start = number(vary, runner.tea.get_value(vary), {vary: 'current value'})
+        low, high, f_low, f_high = bracket(f, start)
+    else:
+        low, high = bounds
+        f_low, f_high = f(low), f(high)
+    root, iterations, converged = brent(f, low, high, f_low, f_high, xtol=xtol, maxiter=maxiter)
+    outputs = runner.run({vary: root})
+    return Solution({vary: root}, outputs, iterations, converged)
+
+def linear_solve(matrix, vector):
+    """
+    Gaussian elimination with partial pivoting, for small systems
+    """
+    n = len(vector)
+    rows = [list(row) + [v] for row, v in zip(matrix, vector)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if rows[pivot][col] == 0:
+            raise ValueError("Singular Jacobian, an input doesn't affect the targets")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, n):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, n + 1):
+                rows[r][c] -= factor * rows[col][c]
+    result = [0.0] * n
+    for r in reversed(range(n)):
+        total = rows[r][n] - sum(rows[r][c] * result[c] for c in range(r + 1, n))
+        result[r] = total / rows[r][r]
+    return result
+
+def solve(tea, targets, vary, guess=None, tol=1e-9, step=1e-6, maxiter=50):
+    """
+    Values of inputs `vary` that make each output equal its target
+
+    Newton's method with a finite difference Jacobian, halving steps that
+    don't reduce the residuals.
+
+    Args:
+        tea (Teaml): the model, left unchanged
+        targets (dict): {output: value wanted}
+        vary (list): names of the inputs to change, one per target
+        guess (dict): {input: starting value}, defaults to current values
+        tol (float): relative tolerance on the outputs
+        step (float): relative step for the Jacobian
+        maxiter (int): most Newton iterations
+
+    Returns:
+        Solution
+    """
+    vary = list(vary)
+    outputs = list(targets)
+    if len(vary) != len(outputs):
+        raise ValueError(f"{len(vary)} inputs for {len(outputs)} targets")
+    runner = ScenarioRunner(tea, outputs)
+    guess = guess or {}
+    x = [guess[name] if name in guess else number(name, runner.tea.get_value(name), {name: 'current value'})
+         for name in vary]
+    scale = [max(1.0, abs(targets[name])) for name in outputs]
+
+    def residuals(x):
+        inputs = dict(zip(vary, x))
+        results = runner.run(inputs)
+        return [(number(name, results[name], inputs) - targets[name]) / s for name, s in zip(outputs, scale)]
+
+    def norm(r):
+        return max(abs(v) for v in r)
+
+    r = residuals(x)
+    for iteration in range(1, maxiter + 1):
+        if norm(r) <= tol:
+            return Solution(dict(zip(vary, x)), runner.run(dict(zip(vary, x))), iteration - 1, True)
+        jacobian = [[0.0] * len(x) for _ in r]
+        for j in range(len(x)):
+            h = step * max(1.0, abs(x[j]))
+            moved = list(x)
+            moved[j] += h
+            for i, v in enumerate(residuals(moved)):
+                jacobian[i][j] = (v - r[i]) / h
+        dx = linear_solve(jacobian, [-v for v in r])
+        scale_step = 1.0
+        while True:
+            candidate = [xi + scale_step * di for xi, di in zip(x, dx)]
+            r_candidate = residuals(candidate)
+            if norm(r_candidate) < norm(r) or scale_step < 1 / 64:
+                break
+            scale_step /= 2
+        x, r = candidate, r_candidate
+    inputs = dict(zip(vary, x))
+    return Solution(inputs, runner.run(inputs), maxiter, norm(r) <= tol)
@@ -0,0 +1,66 @@
+"""
+Synthetic TEAml models for benchmarks and tests
+"""
+
+import random
+
+def generate(nodes=200, depth=3, collisions=0.1, vector_length=0, fan_in=2, inputs=0.2, seed=0):
+    """
+    Generates a random model tree
+
+    Nodes are spread over groups nested `depth` levels deep. A share of them
+    are numeric inputs, the rest are formulas summing scaled references to
+    earlier nodes, so the model has no cycles and every formula computes.
+
+    Args:
+        nodes (int): number of values and formulas
+        depth (int): levels of groups above each node
+        collisions (float): share of nodes reusing an earlier node's name in
+            another group, references to those use their full path
+        vector_length (int): inputs are lists of this length, 0 for numbers
+        fan_in (int): references per formula, at most
+        inputs (float): share of nodes that are inputs
+        seed (int): for the random generator
+
+    Returns:
+        dict: the model, as loaded from yaml
+    """
+    rng = random.Random(seed)
+    root = {}
+    groups = [[]]
+    for level in range(depth):
+        groups = [parent + [f'Group {level}{i}'] for parent in groups for i in range(3)]
+
+    # Place every node first, so references know which names collide
+    paths = []
+    names = {}
+    for n in range(nodes):
+        name = f'Node {n}'
+        if paths and rng.random() < collisions:
+            name = rng.choice(paths)[-1]
+        free = [group for group in groups if tuple(group + [name]) not in names.get(name, ())]
+        if not free:
+            name = f'Node {n}'
+            free = groups
+        path = rng.choice(free) + [name]
+        paths.append(path)
+        names.setdefault(name, set()).add(tuple(path))
+
+    for n, path in enumerate(paths):
+        if n == 0 or rng.random() < inputs:
+            if vector_length:
+                value = [round(rng.uniform(1, 100), 2) for _ in range(vector_length)]
+            else:
+                value = round(rng.uniform(1, 100), 2)
+        else:
+            terms = []
+            for ref in rng.sample(paths[:n], min(fan_in, n)):
+                # Unique names are referenced as is, collided ones by path
+                reference = ref[-1] if len(names[ref[-1]]) == 1 else '.'.join(ref)
+                terms.append(f'{reference} * {round(rng.uniform(0.1, 0.5), 2)}')
+            value = '=' + ' + '.join(terms)
+        container = root
+        for key in path[:-1]:
+            container = container.setdefault(key, {})
+        container[path[-1]] = value
+    return root
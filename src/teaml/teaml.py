@@ -1,31 +1,135 @@
 """
 """
 
+import os
+import re
 from collections import namedtuple
 from copy import deepcopy
 from pathlib import Path
+from time import perf_counter
 from typing import List
 import yaml
 
-from teaml.container import find_container, AmbigousNameError
-from teaml.node import Node, NodeDict, NodeNone, NodeRange
-from teaml.formula.tea_parser import computer, create_namedtuples, filter_bases, iserror
-from teaml.formula.vector import Vector
+from teaml.cache import ModelCache, ResultCache
+from teaml.codegen import compile_model
+from teaml.container import find_container, container_at, AmbigousNameError, NameIndex
+from teaml.graph import DependencyGraph, bind
+from teaml.profiling import Profiler
+from teaml.results import Results
+from teaml.scenario import ScenarioRunner, scenarios
+from teaml import export
+from teaml.sensitivity import Sensitivities
+from teaml import series
+from teaml.series import Series
+from teaml.simulate import PERCENTILES, Simulation
+from teaml.solve import goal_seek, solve
+from teaml.validation import ValidationError, validate
+from teaml.node import Node, NodeDict, NodeNone, NodeRange, NodeSeries, computed_node
+from teaml.formula.tea_parser import computer, create_namedtuples, iserror
+from teaml.formula.vector import vector, vector_types
 from teaml.utils import single_type, munge
 
+# libyaml's C loader and dumper when PyYAML was built with it
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+class Dumper(getattr(yaml, 'CDumper', yaml.Dumper)):
+    pass
+
+Dumper.add_representer(Series, series.represent)
+
 class Teaml:
     @classmethod
-    def loads(cls, yaml_str):
-        # TODO: run validations
-        return cls(yaml.safe_load(yaml_str))
+    def loads(cls, yaml_str, directory=None, validate=False):
+        """
+        Args:
+            directory (str): where relative `!series` files are, defaults to
+                the working directory
+            validate (bool): resolve every reference now, see `validate()`
+
+        Raises:
+            ValidationError: with `validate`, listing every problem found
+        """
+        tea = cls.wrap(yaml.load(yaml_str, Loader=series.loader(SafeLoader, directory)))
+        if validate:
+            tea.check()
+        return tea
 
     @classmethod
-    def load(cls, filename):
-        return cls.loads(open(filename).read())
-
-    def save(self, filename):
+    def load(cls, filename, cache=None, validate=False):
+        """
+        Loads a yaml file
+
+        Args:
+            filename (str): path to the yaml file
+            cache (str or ModelCache): directory for a cache of the parsed
+                model, reused while the file is unchanged
+            validate (bool): resolve every reference now, see `validate()`
+        """
+        if cache is not None:
+            if not isinstance(cache, ModelCache):
+                cache = ModelCache(cache)
+            tea = cache.load(filename, cls=cls)
+            if validate:
+                tea.check()
+            return tea
+        with open(filename, encoding='utf-8') as f:
+            return cls.loads(f.read(), directory=os.path.dirname(filename), validate=validate)
+
+    def validate(self):
+        """
+        Resolves every formula reference, reporting what can't be computed
+
+        The resolved references are kept for `compute`, which then doesn't
+        look any names up.
+
+        Returns:
+            list: a Problem for each syntax error, missing or ambiguous
+                reference, and cycle
+        """
+        return validate(self)
+
+    def check(self):
+        """
+        Raises ValidationError if `validate()` finds any problems
+        """
+        problems = self.validate()
+        if problems:
+            raise ValidationError(problems)
+
+    def save(self, filename, external=None):
+        """
+        Writes the model as yaml
+
+        Args:
+            filename (str): path to the yaml file
+            external (int): write computed ranges of at least this length to
+                binary files in '{name}.series/' beside the yaml, referenced
+                with `!series`, rather than inline
+        """
+        directory = os.path.dirname(filename) or '.'
+        root = self.root if not external else self.externalized(filename, external)
+        # Series paths are relative to the yaml they're written in
+        root = transform(root, lambda data: series.rebased(data, directory) if isinstance(data, Series) else data)
         with open(filename, 'w', encoding='utf-8') as f:
-            f.write(self.dumps())
+            f.write(yaml.dump(root, Dumper=Dumper))
+
+    def externalized(self, filename, length):
+        """
+        `root` with computed ranges of at least `length` written to files
+        """
+        stem = os.path.splitext(filename)[0]
+        folder = stem + '.series'
+        extension = '.npy' if series.numpy is not None else '.f64'
+        results = dict(self.results)
+        for path, result in self.results.items():
+            if not isinstance(result, vector_types) or len(result) < length:
+                continue
+            os.makedirs(folder, exist_ok=True)
+            name = re.sub(r'[^\w.-]', '_', munge('.'.join(path))) + extension
+            series.write(os.path.join(folder, name), result)
+            formula = '=' + munge(formula_of(self.raw_at(path)))
+            results[path] = Series(os.path.join(folder, name), formula=formula)
+        return fold_results(self.tree, results)
 
     @classmethod
     def samples(self):
@@ -40,22 +144,37 @@ class Teaml:
         return Teaml.load(cls.samples()[name])
 
     def dumps(self):
-        return yaml.dump(self.root)
+        return yaml.dump(self.root, Dumper=Dumper)
 
     def find(self, node):
         if isinstance(node, Node):
             return node
-        result = find_container(self.root, node)
-        return Node.new(result.value, path=result.path)
+        result = find_container(self.tree, node, index=self.index)
+        return self.node_at(result.path)
 
     def find_container(self, key):
         if isinstance(key, Node):
             key = key.key
-        return find_container(self.root, key)
+        return find_container(self.tree, key, index=self.index)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = NameIndex(self.tree)
+        return self._index
+
+    @property
+    def root(self):
+        """
+        The tree with computed results written in as '={formula} ={result}'
+        """
+        if self._root is None:
+            self._root = fold_results(self.tree, self.results)
+        return self._root
 
     def raw(self, key):
-        container = self.find_container(key)
-        return container.value
+        path = tuple(self.find_container(key).path)
+        return self.raw_result_at(path)
 
     def get_value(self, key):
         try:
@@ -64,15 +183,58 @@ class Teaml:
             return f'#error(Key:{key})'
         except AmbigousNameError as e:
             return f'#error(Ambigous:{e})'
-        return node.value
+        path = tuple(node.path)
+        if path in self._dirty:
+            self.compute_node(key)
+        return self.value_at(path)
 
     def __getitem__(self, key):
         return self.find(key)
 
     def __setitem__(self, key, value):
+        # Ranges from get_value are written back as the lists yaml has
+        value = transform(value, lambda data: list(data) if isinstance(data, vector_types) else data)
         container = self.find_container(key)
-        container.container[container.key] = value
+        path = tuple(container.path)
+        changed = [path]
+        if isinstance(container.value, dict) or isinstance(value, dict):
+            # Formulas reading the old keys, found before the graph goes
+            self._dirty |= self.graph.downstream(paths_below(container.value, path))
+            # Nested keys are changing, the index must be rebuilt
+            self._index = None
+            self._graph = None
+            self.results = Results({p: v for p, v in self.results.items() if p[:len(path)] != path})
+            changed = paths_below(value, path)
+        self.writable_container(path)[path[-1]] = value
+        if self._graph is not None and formula_of(container.value) != formula_of(value):
+            # Only this formula's references change
+            self._graph = self._graph.updated(self, path, formula_of(value))
+        self.results.pop(path, None)
+        self._root = None
+        self.mark_dirty(*changed)
+        # Formulas written without a result are computed when next read
+        graph = self.graph
+        self._dirty.update(p for p in changed if p in graph and self.is_empty(p))
+
+    def mark_dirty(self, *paths):
+        """
+        Flags computed values downstream of `paths` for recomputation
+        """
+        graph = self.graph
+        if self._dirty:
+            self._dirty = {p for p in self._dirty if p in graph}
+        self._dirty |= graph.downstream(paths)
+        self._dirty.difference_update(paths)
 
+    @property
+    def dirty(self):
+        return sorted(munge(list(path)) for path in self._dirty)
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = DependencyGraph(self)
+        return self._graph
 
     @property
     def formula_nodes(self):
@@ -85,74 +247,277 @@ class Teaml:
     #     existing = container.container[container.key]
     #     container.container[container.key] = value
 
-    def compute(self, key=None):
+    def compute(self, key=None, profile=False, outputs=None, cache=None):
+        """
+        Computes every empty or out of date formula, or just `key`
+
+        Args:
+            key (str): compute this formula, recomputing it even if it has
+                a value, along with any empty formulas it depends on
+            profile (bool): time each formula, see `profile()`
+            outputs (list): only compute what these names depend on
+            cache (str or ResultCache): directory of results from earlier
+                runs, formulas with unchanged inputs are read from it rather
+                than computed. See also `result_cache`.
+
+        Returns:
+            The value of `key`, {name: value} for `outputs`, or the error
+            nodes when computing everything. With `profile`, a list of
+            NodeProfile instead.
+        """
+        if cache is not None:
+            if not isinstance(cache, ResultCache):
+                cache = ResultCache(cache)
+            previous, self.result_cache = self.result_cache, cache
+            try:
+                return self.compute(key, profile=profile, outputs=outputs)
+            finally:
+                self.result_cache = previous
+        if profile:
+            with self.profile() as profiler:
+                self.compute(key, outputs=outputs)
+            return profiler.report()
         if key is not None:
             return self.compute_node(key)
-        for node in self.formula_nodes:
-            if isinstance(node, NodeNone):
-                self.compute_node(node.key)
+        if outputs is not None:
+            return self.compute_outputs(outputs)
+        self.evaluate(self.graph.schedule())
         if self.errors:
             return self.errors
 
-    def compute_node(self, key):
-        container = self.find_container(key)
-        existing_node = Node.new(container.value)
-
-        self.compute_children(existing_node)
-        context = self.build_context(key)
-        formula = existing_node.formula
-        formula = munge(formula) # TODO replace with code specific to formula
-        if not formula:
-            return existing_node.value
+    def compile(self, inputs=(), outputs=None):
+        """
+        Compiles the model into a single Python function
+
+        Args:
+            inputs (list): names that can be overridden on each call
+            outputs (list): names to return, defaults to every formula
+
+        Returns:
+            CompiledModel: called with {input: value}, returns {output: value}
+        """
+        return compile_model(self, inputs, outputs)
+
+    def profile(self):
+        """
+        Context manager timing each formula computed inside it
+
+        Returns:
+            Profiler: call `report()` for the timings
+        """
+        return Profiler(self)
+
+    def compute_outputs(self, outputs):
+        """
+        Computes the formulas `outputs` depend on, and nothing else
+
+        Returns:
+            dict: {name: value} for each of `outputs`
+        """
+        paths = [tuple(self.find_container(name).path) for name in outputs]
+        return dict(zip(outputs, self.values_at(paths)))
+
+    def values_at(self, paths):
+        """
+        Values at `paths`, computing the formulas they depend on
+        """
+        self.evaluate(self.graph.schedule([path for path in paths if path in self.graph]))
+        return [self.value_at(path) for path in paths]
 
+    def compute_node(self, key):
+        path = tuple(self.find_container(key).path)
+        if path not in self.graph:
+            return self.value_at(path)
+        schedule = self.graph.schedule([path])
+        # The target is always recomputed, its references only when empty
+        self.evaluate(schedule._replace(order=[p for p in schedule.order if p != path]))
+        if any(path in cycle for cycle in schedule.cycles):
+            return self.value_at(path)
+        return self.evaluate_path(path)
+
+    def evaluate(self, schedule):
+        """
+        Computes the empty formulas of a `Schedule`, in order
+        """
+        for cycle in schedule.cycles:
+            keys = ','.join(munge(list(path)) for path in cycle)
+            for path in cycle:
+                self.write_result(path, f'#error(cycle {keys})')
+        for path in schedule.order:
+            if path in self._dirty or self.is_empty(path):
+                self.evaluate_path(path)
+
+    def is_empty(self, path):
+        """
+        True for a formula with no computed or stored result
+        """
+        if path in self.results:
+            return False
+        return isinstance(Node.new(self.raw_at(path)), NodeNone)
+
+    def evaluate_path(self, path):
+        """
+        Computes one formula from the current values of its references
+        """
+        hooks = self.hooks
+        if hooks:
+            for hook in hooks:
+                hook.before(self, path)
+            start = perf_counter()
+        formula = munge(self.graph.formulas[path]) # TODO replace with code specific to formula
+        context = self.bound_context(self.graph.bindings[path])
+        if hooks:
+            bound = perf_counter()
         errors = [v for v in context.values() if iserror(v)]
         result = None
         if errors:
             result = errors[0]
+        elif self.result_cache is not None:
+            result = self.result_cache.compute(formula, context, lambda: computer.compute(formula, context))
         else:
             result = computer.compute(formula, context)
-        # TODO: Move this
-        value = f'={formula} ={result}'
-        self[key] = value
+        self.write_result(path, result)
+        self._dirty.discard(path)
+        if hooks:
+            timings = {'context': bound - start, 'compute': perf_counter() - bound}
+            for hook in hooks:
+                hook.after(self, path, result, timings)
         return result
 
-    def compute_children(self, node):
-        for name in node.references:
-            try:
-                child = self.find(name)
-            except KeyError:
-                return f'#error(Key {name})'
-            except AmbigousNameError as e:
-                return f'#error(ambigous {e})'
-            if isinstance(child, NodeNone):
-                self.compute_node(name)
+    def write_result(self, path, result):
+        if type(result) is list:
+            # Convert once, rather than in every dependent's context
+            result = vector(result)
+        self.results[path] = result
+        self._root = None
+
+    def writable_container(self, path):
+        """
+        The container of `path`, copying any containers shared with copies
+        """
+        if self._owned is None:
+            return container_at(self.tree, path)
+        if id(self.tree) not in self._owned:
+            self.tree = self.tree.copy()
+            self._owned[id(self.tree)] = self.tree
+        node = self.tree
+        for key in path[:-1]:
+            child = node[key]
+            if id(child) not in self._owned:
+                child = child.copy()
+                self._owned[id(child)] = child
+                node[key] = child
+            node = child
+        return node
+
+    def raw_at(self, path):
+        return container_at(self.tree, path)[path[-1]]
+
+    def raw_result_at(self, path):
+        if path in self.results:
+            return result_string(self.raw_at(path), self.results[path])
+        raw = self.raw_at(path)
+        if isinstance(raw, (dict, list)) and self.results:
+            # Containers need any results below them
+            return container_at(self.root, path)[path[-1]]
+        return raw
+
+    def value_at(self, path):
+        if path in self.results:
+            return self.results[path]
+        return Node.new(self.raw_at(path)).value
+
+    def node_at(self, path):
+        key = tuple(path)
+        if key in self.results:
+            return computed_node(munge(formula_of(self.raw_at(key))), self.results[key], path=list(path))
+        return Node.new(self.raw_result_at(key), path=list(path))
 
     TraceReport = namedtuple('TraceReport', ['key', 'value', 'depth', 'references'])
     def trace(self, node, seen=None, depth=0, report=None):
-        if not isinstance(node, Node) and isinstance(node, str):
-            node = self.find(node)
-        seen = seen or set()
-        report = report or []
+        """
+        Reports `node` and everything it references, directly or not
 
-        if node.key in seen:
-            return
-        refs = tuple(sorted(set(node.references)))
-        refs = {k:1 for k in refs}
-        refs = filter_bases(refs)
-        refs = tuple(sorted(refs.keys()))
+        References are followed depth first through the dependency graph,
+        each node once. The traversal is memoized per node until the
+        model's structure changes, only the values are looked up each time.
 
-        seen.add(node.key)
-        report.append(self.TraceReport(node.key, node.value, depth, refs))
+        Returns:
+            list: TraceReport per node, '#error(Key)' for missing references
 
-        for ref in refs:
-            try:
-                source = self.find(ref)
-            except KeyError:
-                report.append(self.TraceReport(ref, '#error(Key)', depth + 1, []))
-                continue
-            self.trace(source, seen=seen, depth=depth + 1, report=report)
+        Raises:
+            AmbigousNameError: if a reference matches more than one node
+        """
+        if not isinstance(node, Node) and isinstance(node, str):
+            node = self.find(node)
+        path = tuple(node.path)
+        if seen is None and depth == 0 and report is None:
+            steps = self.graph.traces.get(path)
+            if steps is None:
+                steps = self.graph.traces[path] = self.trace_steps(path)
+        else:
+            if node.key in (seen or ()):
+                return
+            steps = self.trace_steps(path, seen=seen, depth=depth)
+        report = [] if report is None else report
+        for key, step_path, step_depth, refs in steps:
+            value = '#error(Key)' if step_path is None else self.node_at(step_path).value
+            report.append(self.TraceReport(key, value, step_depth, refs))
         return report
 
+    def trace_steps(self, path, seen=None, depth=0):
+        """
+        The (key, path, depth, references) entries of `trace`
+
+        Missing references have a path of None.
+        """
+        seen = set() if seen is None else seen
+        steps = []
+        # Pending (path, depth) to visit or (None, depth, name) to report missing
+        pending = [(path, depth, None)]
+        while pending:
+            path, depth, name = pending.pop()
+            if path is None:
+                steps.append((name, None, depth, []))
+                continue
+            key = munge('.'.join(path))
+            if key in seen:
+                continue
+            bindings = self.graph.bindings.get(path) or {}
+            refs = tuple(sorted(bindings))
+            seen.add(key)
+            steps.append((key, path, depth, refs))
+            children = []
+            for ref in refs:
+                target = bindings[ref]
+                if isinstance(target, AmbigousNameError):
+                    raise AmbigousNameError(target.search, target.paths)
+                if isinstance(target, KeyError):
+                    children.append((None, depth + 1, ref))
+                else:
+                    children.append((target, depth + 1, None))
+            pending.extend(reversed(children))
+        return steps
+
+    def dependents(self, key, transitive=True):
+        """
+        Keys of the formulas that reference `key`
+
+        Args:
+            key (str): name of any node
+            transitive (bool): include formulas that reference it indirectly
+
+        Returns:
+            list: keys in model order
+        """
+        path = tuple(self.find_container(key).path)
+        graph = self.graph
+        if transitive:
+            found = graph.downstream([path])
+        else:
+            found = set(graph.dependents.get(path, []))
+        return [munge('.'.join(p)) for p in graph.formulas if p in found]
+
     @property
     def errors(self):
         return [node for node in walk_nodes(self.root) if node.is_error]
@@ -171,11 +536,27 @@ class Teaml:
     def build_context(self, node):
         if not isinstance(node, Node) and isinstance(node, str):
             node = self.find(node)
-        context = {name: self.get_value(name) for name in node.references}
+        bindings = self.graph.bindings.get(tuple(node.path))
+        if bindings is None:
+            bindings = bind(self.find_container, node.references)
+        return self.bound_context(bindings)
+
+    def bound_context(self, bindings):
+        """
+        Context for a formula from its resolved references
+        """
+        context = {}
+        for name, ref in bindings.items():
+            if isinstance(ref, KeyError):
+                context[name] = f'#error(Key:{name})'
+            elif isinstance(ref, AmbigousNameError):
+                context[name] = f'#error(Ambigous:{ref})'
+            else:
+                context[name] = self.value_at(ref)
         # TODO: move this
         for k in context:
             if isinstance(context[k], list):
-                context[k] = Vector(context[k])
+                context[k] = vector(context[k])
         context = create_namedtuples(context)
         return context
 
@@ -184,15 +565,185 @@ class Teaml:
         return all([n in context for n in needs])
 
     def __init__(self, root):
-        self.root = deepcopy(root)
+        self._setup(deepcopy(root))
+
+    def _setup(self, root):
+        self.tree = root
+        # path -> computed value, see `root` for the tree with results
+        self.results = Results()
+        self._root = None
+        self._index = None
+        self._graph = None
+        self._dirty = set()
+        # ComputeHooks called around each formula evaluation
+        self.hooks = []
+        # ResultCache consulted before computing each formula
+        self.result_cache = None
+        # ids of the containers this instance may write to, None for all
+        self._owned = None
+
+    @classmethod
+    def wrap(cls, root):
+        """
+        A Teaml over `root` without copying it, `root` must not be shared
+        """
+        tea = cls.__new__(cls)
+        tea._setup(root)
+        return tea
 
     def copy(self):
-        return Teaml(deepcopy(self.root))
+        # Copy on write: both share the tree, and copy containers along a
+        # path the first time they write below it
+        tea = Teaml.wrap(self.tree)
+        tea.results = self.results.fork()
+        tea._owned = {}
+        self._owned = {}
+        # Same keys and formulas, so the index and graph can be shared
+        tea._index = self._index
+        tea._graph = self._graph
+        tea._dirty = set(self._dirty)
+        tea.hooks = list(self.hooks)
+        tea.result_cache = self.result_cache
+        return tea
 
     def reset(self):
-        tea = self.copy()
-        data = transform(tea.root, reset_value_transformer)
-        return Teaml(data)
+        # transform builds new containers, nothing is shared
+        data = transform(self.tree, reset_value_transformer)
+        return Teaml.wrap(data)
+
+    def batch(self, overrides, outputs, workers=None, chunksize=64):
+        """
+        Evaluates a list of {input: value} scenarios
+
+        Returns a list of {output: value}, one per scenario. The model itself
+        is left unchanged. With `workers`, scenarios are spread over that
+        many processes (see ParallelExecutor).
+        """
+        if workers:
+            # Imported here so `python -m teaml.parallel` doesn't find the
+            # module already loaded by the package
+            from teaml.parallel import ParallelExecutor
+            executor = ParallelExecutor(workers=workers, chunksize=chunksize)
+            return list(executor.run(self, overrides, outputs))
+        runner = ScenarioRunner(self, outputs)
+        return [runner.run(scenario) for scenario in overrides]
+
+    def export(self, filename, scenarios=None, outputs=None):
+        """
+        Writes computed values to a columnar file, see `teaml.export`
+
+        Args:
+            filename (str): '.parquet', '.arrow' or '.feather' with pyarrow,
+                or '.tcol' without
+            scenarios (list): {input: value} overrides to export, one set of
+                rows each, otherwise the model as it is
+            outputs (list): names to export, defaults to every value other
+                than items in lists
+        """
+        if outputs is None:
+            paths = self.value_paths()
+        else:
+            paths = [tuple(self.find_container(name).path) for name in outputs]
+        keys = [munge(list(path)) for path in paths]
+        runner = ScenarioRunner(self, [])
+        results = []
+        for scenario in scenarios or [{}]:
+            runner.run(scenario)
+            results.append(dict(zip(keys, runner.tea.values_at(paths))))
+        export.write(filename, export.columns(results))
+
+    def value_paths(self):
+        """
+        Paths of every value and formula, other than items in lists
+        """
+        paths = []
+        for data, path in walk(self.tree):
+            if isinstance(data, dict) or any(isinstance(p, int) for p in path):
+                continue
+            if isinstance(data, list) and single_type(data) not in (int, float, str):
+                continue
+            paths.append(tuple(path))
+        return paths
+
+    def sweep(self, inputs, outputs, grid=True, workers=None, chunksize=64):
+        """
+        Evaluates outputs over ranges of inputs
+
+        Args:
+            inputs (dict): {input: [values]} to sweep
+            outputs (list): names of the values to report
+            grid (bool): every combination of inputs, otherwise zip them
+            workers (int): worker processes, evaluate in this process if None
+            chunksize (int): scenarios sent to a worker at a time
+
+        Returns:
+            dict: {name: [values]} columns for each input and output
+        """
+        rows = scenarios(inputs, grid=grid)
+        results = self.batch(rows, outputs, workers=workers, chunksize=chunksize)
+        table = {name: [row[name] for row in rows] for name in inputs}
+        table.update({name: [result[name] for result in results] for name in outputs})
+        return table
+
+    def goal_seek(self, target, value, vary, bounds=None, **options):
+        """
+        Finds the value of input `vary` giving `target` == `value`
+
+        Brent's method over incremental recomputes, the model itself is
+        unchanged. See `teaml.solve.goal_seek` for `options`.
+
+        Returns:
+            Solution: `inputs` holds {vary: value found}
+        """
+        return goal_seek(self, target, value, vary, bounds=bounds, **options)
+
+    def solve(self, targets, vary, guess=None, **options):
+        """
+        Finds values of several inputs giving {output: value} `targets`
+
+        Newton's method, see `teaml.solve.solve` for `options`.
+
+        Returns:
+            Solution
+        """
+        return solve(self, targets, vary, guess=guess, **options)
+
+    def sensitivities(self, outputs, inputs=None):
+        """
+        Partial derivatives of `outputs` with respect to `inputs`
+
+        All inputs are differentiated in a single pass with dual numbers,
+        the model itself is unchanged. See `teaml.sensitivity`.
+
+        Args:
+            outputs (list): names of the values to differentiate
+            inputs (list): names of the values to differentiate by, defaults
+                to every number the outputs depend on
+
+        Returns:
+            dict: {output: {input: derivative}}
+        """
+        return Sensitivities(self, outputs, inputs).report()
+
+    def simulate(self, distributions, outputs, n=10000, seed=None, percentiles=PERCENTILES):
+        """
+        Monte Carlo statistics of `outputs` for uncertain inputs
+
+        Each input is sampled `n` times and the formulas downstream of them
+        are evaluated once over the sample arrays. Requires NumPy, see
+        `teaml.simulate`.
+
+        Args:
+            distributions (dict): {input: Distribution}, e.g. Normal(0.25, 0.02)
+            outputs (list): names of the values to summarize
+            n (int): number of samples
+            seed: makes the samples reproducible
+            percentiles (tuple): percentiles to report as 'p{n}'
+
+        Returns:
+            dict: {output: {'mean', 'sd', 'min', 'max', 'failed', 'p5', ...}}
+        """
+        return Simulation(self, distributions, n, outputs, seed=seed).summary(percentiles)
 
     def df(self, key, index=None):
         try:
@@ -201,7 +752,7 @@ class Teaml:
             raise ImportError("Pandas is required for this feature")
 
         node = self.find(key)
-        if isinstance(node, NodeRange):
+        if isinstance(node, (NodeRange, NodeSeries)):
             return pd.DataFrame(node.value)
         df = pd.DataFrame(self.as_columns(key))
         if index:
@@ -212,7 +763,7 @@ class Teaml:
         parent = self.find(key)
         if not isinstance(parent, NodeDict):
             raise ValueError(f"Can't make columns of {type(parent)}")
-        range_nodes = [n for n in walk_nodes(parent) if isinstance(n, NodeRange)]
+        range_nodes = [n for n in walk_nodes(parent) if isinstance(n, (NodeRange, NodeSeries))]
         lengths = [len(n.value) for n in range_nodes]
         if len(set(lengths)) > 1:
             raise ValueError(f"Unequal lengths: {lengths}")
@@ -225,8 +776,8 @@ class Teaml:
         node_count = len(list(iter(self)))
         return f"Teaml: {node_count} nodes"
 
-def load(filename):
-    return Teaml.load(filename)
+def load(filename, cache=None, validate=False):
+    return Teaml.load(filename, cache=cache, validate=validate)
 
 def sample(name):
     return Teaml.sample(name)
@@ -287,6 +838,12 @@ def walk_nodes(root):
                 print(f"Path: {path}")
                 raise e
 
+def paths_below(data, path):
+    """
+    `path` and the path of everything in `data`, the value at `path`
+    """
+    return [path] + [path + tuple(p) for (_, p) in walk(data)]
+
 def walk(node, path=None):
     path = path or []
     if isinstance(node, dict):
@@ -318,7 +875,44 @@ def transform(data, fn):
     else:
         return fn(data)
 
+def result_string(raw, result):
+    """
+    The stored form of a computed formula
+    """
+    return f'={munge(formula_of(raw))} ={result}'
+
+def fold_results(tree, results):
+    """
+    Returns `tree` with each result written in at its path
+
+    Only containers along result paths are copied, the rest is shared.
+    """
+    if not results:
+        return tree
+    root = tree.copy()
+    copied = {id(root)}
+    for path, result in results.items():
+        node = root
+        for key in path[:-1]:
+            child = node[key]
+            if id(child) not in copied:
+                child = child.copy()
+                copied.add(id(child))
+                node[key] = child
+            node = child
+        node[path[-1]] = result if isinstance(result, Series) else result_string(node[path[-1]], result)
+    return root
+
+def formula_of(data):
+    if isinstance(data, Series):
+        return data.formula
+    if not isinstance(data, str):
+        return None
+    return Node.new(data).formula
+
 def reset_value_transformer(data):
+    if isinstance(data, Series) and data.formula:
+        return data.formula
     if not isinstance(data, str):
         return data
     node = Node.new(data)
@@ -0,0 +1,22 @@
+import teaml as tml
+from teaml.codegen import rewrite
+
+def test_rewrite():
+    assert rewrite('a.b*2+max(c,1)', {'a.b': 'v0', 'c': 'v1'}) == 'v0*2+max(v1,1)'
+    assert rewrite('sum([x for x in a])', {'a': 'v0', 'x': 'v1'}) is None
+    assert rewrite('unknown+1', {}) is None
+
+def test_compile_errors():
+    tea = tml.loads('''\
+a: 2
+b: =a / c
+c: 0
+d: =b + missing
+e: =[x * a for x in range(3)]
+f: =g
+g: =f
+''')
+    model = tea.compile(inputs=['c'])
+    tea.compute()
+    assert model() == {name: tea.get_value(name) for name in 'bdefg'}
+    assert model({'c': 4}) == {'b': 0.5, 'd': '#error(Key:missing)', 'e': '#error(Key:x)', 'f': '#error(cycle f,g)', 'g': '#error(cycle f,g)'}
@@ -4,7 +4,9 @@ import yaml
 import pytest
 
 import teaml as tml
-from teaml.container import find_container, PathMatch
+from teaml.container import find_container, NameIndex, PathMatch
+
+from .config import finance101yaml
 
 def container1():
     return yaml.safe_load('''\
@@ -61,4 +63,30 @@ def test_path_match():
 def test_ambiguous():
     data = container1()
     with pytest.raises(ValueError):
-        find_container(data, 'cap')
\ No newline at end of file
+        find_container(data, 'cap')
+
+def test_index_matches_walk(finance101yaml):
+    for data in [container1(), container2(), yaml.safe_load(finance101yaml)]:
+        index = NameIndex(data)
+        searches = ['cap', 'capacity', 'mixed.capacity', 'c.d', 'b.d', 'missing', '', 'Annual.BatteryOutput',
+            'Revenue.Battery Output', 'Total Project Cash Flow', 'Solar', 'PV.Solar Capacity', 'EBIDTA']
+        for search in searches:
+            try:
+                expected = find_container(data, search)
+            except (KeyError, ValueError) as e:
+                with pytest.raises(type(e), match=str(e)):
+                    find_container(data, search, index=index)
+                continue
+            found = find_container(data, search, index=index)
+            assert found == expected
+            # memoized lookups still hand out fresh paths
+            found.path.append('x')
+            assert find_container(data, search, index=index) == expected
+
+def test_index_prefixed():
+    index = NameIndex(container1())
+    assert index.prefixed('capacity') == [
+        ['outer', 'inputs', 'mixed level', 'capacity'],
+        ['outer', 'inputs', 'mixed level', 'capacity value'],
+        ['outer', 'outputs', 'capacity']]
+    assert index.prefixed('') == []
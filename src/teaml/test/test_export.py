@@ -0,0 +1,63 @@
+import math
+
+import pytest
+import teaml as tml
+from teaml import export
+
+from .config import finance101yaml
+
+model = '''\
+price: 2
+volume: [10, 20, 30]
+revenue: =price * volume
+total: =sum(revenue)
+label: hello
+missing: =nothing * 2
+'''
+
+def test_columns():
+    table = export.columns([{'a': 1, 'b': [1.5, 2], 'c': 'x', 'd': None}])
+    assert table['value'] == [1.0, None, None, None]
+    assert table['series'][1] == [1.5, 2]
+    assert table['text'] == [None, None, 'x', None]
+
+@pytest.mark.parametrize('with_numpy', [True, False])
+def test_export_tcol(tmp_path, monkeypatch, with_numpy):
+    if not with_numpy:
+        monkeypatch.setattr(export, 'numpy', None)
+    tea = tml.loads(model)
+    filename = str(tmp_path / 'model.tcol')
+    tea.export(filename, scenarios=[{'price': 2}, {'price': 3}])
+    table = export.read(filename)
+    assert list(table['scenario']) == [0] * 6 + [1] * 6
+    assert table['path'][:6] == ['price', 'volume', 'revenue', 'total', 'label', 'missing']
+    assert list(table['value'][:4:3]) == [2.0, 120.0]
+    assert table['value'][9] == 180.0
+    assert math.isnan(table['value'][4])
+    assert list(table['series'][8]) == [30.0, 60.0, 90.0]
+    assert table['series'][0] is None
+    assert table['text'][4] == 'hello'
+    assert table['text'][5] == '#error(Key:nothing)'
+    assert tea.results == {}
+
+def test_export_outputs(tmp_path, finance101yaml):
+    fin = tml.loads(finance101yaml)
+    filename = str(tmp_path / 'fin.tcol')
+    fin.export(filename, scenarios=[{'SolarCapacity': c} for c in (90, 100)], outputs=['IRR'])
+    table = export.read(filename)
+    assert table['path'] == ['Finance101.Summary.IRR'] * 2
+    assert table['value'][1] == fin.compute('IRR')
+
+def test_export_arrow(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    pa = pytest.importorskip('pyarrow')
+    tea = tml.loads(model)
+    tea.export(str(tmp_path / 'model.parquet'))
+    table = pq.read_table(str(tmp_path / 'model.parquet'))
+    assert table.column('series').to_pylist()[2] == [20, 40, 60]
+    assert table.column('value').to_pylist()[:2] == [2.0, None]
+    tea.export(str(tmp_path / 'model.arrow'))
+    with pa.memory_map(str(tmp_path / 'model.arrow')) as source:
+        assert pa.ipc.open_file(source).read_all().equals(table)
+    with pytest.raises(ValueError):
+        tea.export(str(tmp_path / 'model.csv'))
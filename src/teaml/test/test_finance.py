@@ -0,0 +1,62 @@
+import math
+
+import pytest
+import teaml as tml
+from teaml.formula import finance
+
+flows = [-115_000_000, 17_853_058, 20_920_596, 18_003_174, 19_000_000, 25_000_000, 30_000_000, 35_000_000]
+
+def test_npv_pmt():
+    assert finance.npv(0.1, [-100, 110]) == pytest.approx(0, abs=1e-12)
+    assert abs(finance.npv(0.1, flows[:4]) - -67_954_147.42299025) < 1e-6
+    assert finance.npv(0.1, [-100, 110], start_from_zero=False) == pytest.approx(0, abs=1e-12)
+    assert finance.pmt(0, 10, 100) == -10
+    assert abs(-finance.pmt(0.1, 25, 1) - 0.11016807219002082) < 1e-15
+
+def test_irr():
+    rate = finance.irr(flows)
+    assert abs(finance.npv(rate, flows)) < 1e-3
+    assert abs(finance.irr([-1, 0, 1, 2, 3], 0.1) - 0.7613778285466168) < 1e-9
+    with pytest.raises(ValueError):
+        finance.irr([1, 2, 3])
+
+def test_irr_batch():
+    rows = [flows, [v * 2 for v in flows], [-100, 60, 60], [1, 2, 3]]
+    rates = finance.irr(rows)
+    assert rates[0] == pytest.approx(finance.irr(flows), abs=1e-12)
+    assert rates[1] == pytest.approx(rates[0], abs=1e-12)
+    assert rates[2] == pytest.approx(finance.irr([-100, 60, 60]), abs=1e-12)
+    assert math.isnan(rates[3])
+    assert list(finance.npv(0.1, rows[:3])) == pytest.approx([finance.npv(0.1, row) for row in rows[:3]])
+
+def test_irr_batch_numpy():
+    numpy = pytest.importorskip('numpy')
+    rng = numpy.random.default_rng(0)
+    rows = numpy.hstack([numpy.full((1000, 1), -100.0), rng.uniform(5, 20, (1000, 24))])
+    rates = finance.irr(rows)
+    assert all(abs(finance.npv(r, row)) < 1e-8 for r, row in zip(rates, rows.tolist()))
+
+def test_xirr():
+    dates = ['2020-01-01', '2020-07-01', '2021-03-01']
+    rate = finance.xirr(dates, [-100, 50, 70])
+    times = finance.year_fractions(dates)
+    assert abs(finance.present_value(rate, [-100, 50, 70], times)) < 1e-9
+    assert finance.xirr(dates, [[-100, 50, 70]])[0] == pytest.approx(rate, abs=1e-12)
+
+def test_pyxirr_agrees():
+    pyxirr = pytest.importorskip('pyxirr')
+    assert finance.irr(flows) == pytest.approx(pyxirr.irr(flows), abs=1e-12)
+    assert finance.npv(0.07, flows) == pytest.approx(pyxirr.npv(0.07, flows))
+    assert finance.pmt(0.05, 30, 1000, 10, pmt_at_beginning=True) == pytest.approx(
+        pyxirr.pmt(0.05, 30, 1000, 10, pmt_at_beginning=True))
+
+def test_batch_formula():
+    tea = tml.loads('''\
+Scenarios:
+  - [-100, 60, 60]
+  - [-100, 50, 70]
+IRRs: =irr(Scenarios, 0.1)
+''')
+    rates = tea.compute('IRRs')
+    assert rates[0] == pytest.approx(finance.irr([-100, 60, 60]))
+    assert rates[1] == pytest.approx(finance.irr([-100, 50, 70]))
@@ -1,4 +1,5 @@
 import json
+import pickle
 import yaml
 
 try:
@@ -8,6 +9,8 @@ except ImportError:
 
 import teaml as tml
 
+from teaml.utils import munge
+
 from .config import finance101yaml
 
 def diff(a, b):
@@ -78,3 +81,66 @@ def test_irr(finance101yaml):
 
     
 
+
+def test_incremental(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    fin.compute()
+    battery = fin.get_value('Annual.Battery Output')
+    fin['SolarCapacity'] = 58.0
+    assert 'Finance101.Summary.IRR' in fin.dirty
+    assert 'Finance101.Inputs.BESS.BatteryCapacity' not in fin.dirty
+    assert fin.get_value('IRR') == 0.21242872060127135
+    fin.compute()
+    assert fin.dirty == []
+    assert fin.get_value('Annual.Battery Output') is battery
+    assert fin.get_value('NPV') == fin.copy().reset().compute('NPV')
+
+def test_sweep(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    table = fin.sweep({'SolarCapacity': [100, 58]}, outputs=['IRR'])
+    assert table == {
+        'SolarCapacity': [100, 58],
+        'IRR': [0.1904322297190342, 0.21242872060127135]}
+    # The model itself is untouched
+    assert fin.raw('SolarCapacity') == '100 MWac'
+    assert fin['IRR'].is_none
+
+def test_sweep_grid(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    table = fin.sweep({'SolarCapacity': [100, 58], 'Inflation': [0.025, 0.03]}, outputs=['IRR', 'NPV'])
+    assert len(table['IRR']) == 4
+    assert table['SolarCapacity'] == [100, 100, 58, 58]
+    assert table['Inflation'] == [0.025, 0.03, 0.025, 0.03]
+    assert table['NPV'][0] == 68746191.83357899
+    tea = fin.copy()
+    tea['SolarCapacity'] = 58
+    tea['Inflation'] = 0.03
+    assert table['IRR'][3] == tea.compute('IRR')
+
+def test_batch_restores(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    results = fin.batch([{'SolarCapacity': 58.0}, {'Inflation': 0.025}, {}], outputs=['IRR'])
+    assert results == [
+        {'IRR': 0.21242872060127135},
+        {'IRR': 0.1904322297190342},
+        {'IRR': 0.1904322297190342}]
+
+def test_compile(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    model = fin.compile()
+    results = model()
+    fin.compute()
+    for path in fin.graph.formulas:
+        expected = fin.value_at(path)
+        assert str(results[munge(list(path))]) == str(expected)
+    model = pickle.loads(pickle.dumps(fin.compile(inputs=['SolarCapacity', 'Inflation'], outputs=['IRR', 'NPV'])))
+    scenarios = [{'SolarCapacity': 58, 'Inflation': 0.03}, {'SolarCapacity': '58 MWac'}, {}]
+    assert [model(s) for s in scenarios] == fin.batch(scenarios, outputs=['IRR', 'NPV'])
+
+def test_compute_outputs(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    values = fin.compute(outputs=['IRR', 'NPV'])
+    full = tml.loads(finance101yaml)
+    full.compute()
+    assert values == {'IRR': full.get_value('IRR'), 'NPV': full.get_value('NPV')}
+    assert len(fin.results) < len(full.results)
@@ -0,0 +1,146 @@
+import teaml as tml
+from teaml.graph import strongly_connected
+
+def chain(length):
+    lines = ['chain:', '  n0: 1']
+    lines += [f'  n{i}: =n{i - 1} + 1' for i in range(1, length)]
+    return tml.loads('\n'.join(lines))
+
+def test_schedule_order():
+    dependencies = {'c': ['a', 'b'], 'b': ['a'], 'a': []}
+    assert strongly_connected(['c'], dependencies) == (['a', 'b', 'c'], [])
+    assert strongly_connected(['a', 'b'], dependencies) == (['a', 'b'], [])
+
+def test_schedule_cycles():
+    dependencies = {'a': ['b'], 'b': ['a'], 'c': ['a'], 'd': ['d']}
+    order, cycles = strongly_connected(['c', 'd'], dependencies)
+    assert order == ['c']
+    assert cycles == [['a', 'b'], ['d']]
+
+def test_graph_bindings():
+    tea = tml.loads('''\
+inputs:
+  a: 1
+  ab: 2
+outputs:
+  total: =a + missing
+  double: =total * 2
+''')
+    graph = tea.graph
+    assert len(graph) == 2
+    bindings = graph.bindings[('outputs', 'total')]
+    assert bindings['a'] == ('inputs', 'a')
+    assert isinstance(bindings['missing'], KeyError)
+    assert graph.dependencies[('outputs', 'double')] == [('outputs', 'total')]
+
+def test_long_chain():
+    tea = chain(2000)
+    assert tea.compute('n1999') == 2000
+    tea = chain(2000)
+    assert tea.compute() is None
+    assert tea['n1999'].value == 2000
+
+def test_cycle_errors():
+    tea = tml.loads('''\
+loop:
+  a: =b + 1
+  b: =a + 1
+  c: =a * 2
+  d: 4
+''')
+    errors = tea.compute()
+    assert errors == ['#error(cycle loop.a,loop.b)', '#error(cycle loop.a,loop.b)', '#error(cycle loop.a,loop.b)']
+    assert tea.compute('d') == 4
+    assert tea.compute('a') == '#error(cycle loop.a,loop.b)'
+
+def test_compute_outputs():
+    tea = tml.loads('''\
+a: 1
+b: =a + 1
+c: =b * 2
+unused: =a + 100
+''')
+    assert tea.compute(outputs=['c', 'a']) == {'c': 4, 'a': 1}
+    # Only the formulas upstream of the outputs were resolved and computed
+    assert set(dict.keys(tea.graph.bindings)) == {('b',), ('c',)}
+    assert ('unused',) not in tea.results
+    assert tea.graph.dependents[('a',)] == [('b',), ('unused',)]
+
+def test_copy_then_change_keys():
+    tea = tml.loads('''\
+a: =grp.x + 1
+b: =x * 2
+grp:
+  x: 1
+other:
+  y: 3
+''')
+    assert tea.compute(outputs=['a']) == {'a': 2}
+    copy = tea.copy()
+    tea['grp'] = {'x2': 7}
+    tea['other'] = {'x': 100}
+    # The copy's unresolved formulas still see its own keys
+    assert copy.compute(outputs=['b']) == {'b': 2}
+    assert copy.compute('a') == 2
+
+def test_dependents():
+    tea = tml.loads('''\
+a: 1
+b: =a + 1
+c: =b * 2
+d: =a + x
+''')
+    assert tea.dependents('a', transitive=False) == ['b', 'd']
+    assert tea.dependents('a') == ['b', 'c', 'd']
+    assert tea.dependents('c') == []
+    copy = tea.copy()
+    graph = tea.graph
+    tea['c'] = '=a * 3'
+    # The graph was updated rather than rebuilt, and the copy kept its own
+    assert tea.graph.bindings[('b',)] is graph.bindings[('b',)]
+    assert tea.dependents('b') == []
+    assert tea.dependents('a', transitive=False) == ['b', 'c', 'd']
+    assert copy.dependents('b') == ['c']
+
+def test_trace():
+    tea = tml.loads('''\
+a: 1
+b: =a + missing
+c: =b * a
+''')
+    tea.compute()
+    report = tea.trace('c')
+    assert [(r.key, r.value, r.depth) for r in report] == [
+        ('c', '#error(Key:missing)', 0),
+        ('a', 1, 1),
+        ('b', '#error(Key:missing)', 1),
+        ('missing', '#error(Key)', 2)]
+    assert report[0].references == ('a', 'b')
+    tea['a'] = 2
+    tea.compute()
+    assert tea.trace('c')[1].value == 2
+    long = chain(3000)
+    assert long.trace('n2999')[-1].key == 'chain.n0'
+
+def test_dependents_skip_syntax_errors():
+    tea = tml.loads('a: 2\nx: =1 +\ny: =a * 3\n')
+    tea['a'] = 5
+    assert tea.compute('y') == 15
+    tea['x'] = '=2 +'
+    tea['x'] = '=a'
+    assert tea.get_value('x') == 5
+    assert tea.batch([{'a': 1}], ['y']) == [{'y': 3}]
+
+def test_replace_container_dirty():
+    tea = tml.Teaml({'a': '=grp.x + 1', 'b': '=other.y * 2', 'grp': {'x': 1}, 'other': {'y': 3}})
+    tea.compute()
+    assert tea.get_value('a') == 2
+    tea['grp'] = {'x': 7}
+    assert tea.dirty == ['a']
+    tea.compute()
+    assert tea.get_value('a') == 8
+    # Formulas reading removed keys, and new formulas in the container
+    tea['other'] = {'z': 1, 'w': '=z + 1'}
+    assert tea.dirty == ['b', 'other.w']
+    assert tea.get_value('w') == 2
+    assert tea.get_value('b').startswith('#error')
@@ -8,7 +8,11 @@ from teaml.node import (
     NodeInt,
     NodeNone,
     NodeError,
+    NodeFloat,
+    NodeRange,
     NodeString,
+    as_num,
+    bulk_numbers,
     parse_string,
 )
 
@@ -60,4 +64,46 @@ def test_error():
         'key': [],
         'path': [],
         'type': NodeError,
-        'value': '#error: division by zero'}
\ No newline at end of file
+        'value': '#error: division by zero'}
+
+def test_as_num():
+    assert as_num('5') == 5 and type(as_num('5')) is int
+    assert type(as_num('5.0')) is float
+    assert type(as_num('1e3')) is float
+    assert as_num(' 7 ') == 7
+    assert as_num('1_000') == 1000
+    assert as_num('-Infinity') == float('-inf')
+    # Too big to be exactly a float
+    assert type(as_num('12345678901234567890')) is float
+    assert as_num('1.2.3') is None
+    assert as_num('MW') is None
+
+def test_scalar_forms():
+    assert parse_string('5%') == 0.05 and type(parse_string('5%')) is NodeFloat
+    assert parse_string('$30/MWh') == 30
+    assert parse_string('1.5e3 kg') == 1500.0
+    assert parse_string('$1,000') == '1,000'
+    assert parse_string('hello world').is_none
+
+def test_ranges():
+    assert parse_string('[1, 2.5]') == [1, 2.5]
+    assert parse_string('[a,b]') == ['a', 'b']
+    assert parse_string('[1,a]') == ['1', 'a']
+    assert parse_string('[]') == ['']
+    assert parse_string('[+1, .5]') == [1, 0.5]
+    assert bulk_numbers('[1, 2.5, -3e2]') == [1, 2.5, -300.0]
+    # Left to as_num
+    assert bulk_numbers('[12345678901234567890]') is None
+    assert bulk_numbers('[true, null]') is None
+    assert bulk_numbers('[]') is None
+
+def test_memoized_nodes_are_new():
+    first = Node.new('=a+b =[1,2,3]', path=['x'])
+    second = Node.new('=a+b =[1,2,3]', path=['y'])
+    first.append(4)
+    first.path.append('z')
+    assert second == [1, 2, 3] and type(second) is NodeRange
+    assert second.path == ['y']
+    assert second.formula == '=a+b'
+    assert parse_string('12 MW').as_dict == parse_string('12 MW').as_dict
+
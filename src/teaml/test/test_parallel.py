@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+
+import teaml as tml
+from teaml.parallel import ParallelExecutor, chunked, main
+
+from .config import finance101yaml
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 2)) == []
+
+def test_parallel_sweep(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    inputs = {'SolarCapacity': [100, 58, 75, 90, 120], 'Inflation': [0.02, 0.025]}
+    serial = fin.sweep(inputs, outputs=['IRR', 'NPV'])
+    parallel = fin.sweep(inputs, outputs=['IRR', 'NPV'], workers=2, chunksize=3)
+    assert parallel == serial
+
+def test_parallel_streaming(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    overrides = ({'SolarCapacity': capacity} for capacity in [100, 58])
+    executor = ParallelExecutor(workers=2, chunksize=1, backlog=1)
+    results = list(executor.run(fin, overrides, ['IRR']))
+    assert results == [{'IRR': 0.1904322297190342}, {'IRR': 0.21242872060127135}]
+
+def test_parallel_dirty(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    fin.compute()
+    fin['SolarCapacity'] = 58.0
+    overrides = [{}, {'Inflation': 0.03}]
+    serial = fin.batch(overrides, ['IRR', 'NPV'])
+    assert serial[0]['IRR'] == 0.21242872060127135
+    assert fin.batch(overrides, ['IRR', 'NPV'], workers=2, chunksize=1) == serial
+
+def test_main(tmp_path, finance101yaml):
+    model = tmp_path / 'model.yaml'
+    model.write_text(finance101yaml)
+    scenarios = tmp_path / 'scenarios.jsonl'
+    scenarios.write_text('{"SolarCapacity": 58.0}\n\n{}\n')
+    results = tmp_path / 'results.jsonl'
+    main([str(model), '--outputs', 'IRR', 'Year', '--scenarios', str(scenarios),
+        '--results', str(results), '--workers', '1'])
+    rows = [json.loads(line) for line in results.read_text().splitlines()]
+    assert [row['IRR'] for row in rows] == [0.21242872060127135, 0.1904322297190342]
+    assert rows[0]['Year'] == list(range(1, 26))
+
+def test_run_module(tmp_path):
+    model = tmp_path / 'model.yaml'
+    model.write_text('a: 1\nb: =a * 2\n')
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(tml.__file__)))
+    # -W error: runpy warns if the package had already imported the module
+    done = subprocess.run([sys.executable, '-W', 'error', '-m', 'teaml.parallel', str(model),
+        '--outputs', 'b', '--workers', '1'], input='{"a": 3}\n', capture_output=True, text=True, env=env)
+    assert done.returncode == 0, done.stderr
+    assert json.loads(done.stdout) == {'b': 6}
+
@@ -0,0 +1,47 @@
+import os
+
+import teaml as tml
+from teaml.cache import ResultCache
+
+from .config import finance101yaml
+
+def test_result_cache(tmp_path, finance101yaml):
+    cache = ResultCache(tmp_path)
+    first = tml.loads(finance101yaml)
+    first.compute(cache=cache)
+    assert cache.hits == 0 and cache.misses > 0
+    assert first.result_cache is None
+
+    # Another run, in a fresh cache as another process would have
+    second = tml.loads(finance101yaml)
+    rerun = ResultCache(tmp_path)
+    second.compute(cache=rerun)
+    assert rerun.misses == 0 and rerun.hits == cache.misses
+    assert second.results == first.results
+
+    changed = tml.loads(finance101yaml)
+    changed['SolarCapacity'] = 120
+    partial = ResultCache(tmp_path)
+    changed.compute(cache=partial)
+    expected = tml.loads(finance101yaml)
+    expected['SolarCapacity'] = 120
+    expected.compute()
+    assert changed.get_value('IRR') == expected.get_value('IRR')
+    assert 0 < partial.misses < cache.misses
+    assert partial.hits > 0
+
+def test_result_cache_eviction(tmp_path):
+    tea = tml.loads('\n'.join(f'f{i}: =x + {i}' for i in range(50)) + '\nx: 1\n')
+    cache = ResultCache(tmp_path, max_bytes=100)
+    tea.compute(cache=cache)
+    entries, size = cache.scan()
+    assert size <= 100
+    assert 0 < len(entries) < 50
+
+    # Damaged entries are misses
+    for _, _, path in entries:
+        path.write_bytes(b'broken')
+    again = ResultCache(tmp_path)
+    tml.loads('f0: =x + 0\nx: 1\n').compute(cache=again)
+    assert again.hits == 0
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
@@ -0,0 +1,46 @@
+import teaml as tml
+from teaml.formula.dual import Dual
+from .config import finance101yaml
+
+def test_dual():
+    x = Dual(3.0, {'x': 1.0})
+    y = Dual(2.0, {'y': 1.0})
+    assert (x * y).grad == {'x': 2.0, 'y': 3.0}
+    assert (x / y).grad == {'x': 0.5, 'y': -0.75}
+    assert (x ** 2).grad == {'x': 6.0}
+    assert (1 - x).grad == {'x': -1.0}
+    assert sum([x, y, 1]) == 6.0
+    assert float(x * 0.1) == 3.0 * 0.1
+
+def test_sensitivities():
+    tea = tml.loads('''\
+price: 2
+volume: [10, 20, 30]
+cost: 5
+revenue: =price * volume
+profit: =sum(revenue) - cost
+label: hello
+big: =sumif(revenue, volume, 20)
+double: =float(profit) * 2
+ratio: =profit / cost
+''')
+    result = tea.sensitivities(['profit', 'ratio', 'revenue', 'big', 'double'])
+    assert result['profit'] == {'price': 60.0, 'volume': 6.0, 'cost': -1.0}
+    assert result['ratio']['cost'] == -(120 - 5) / 25 - 1 / 5
+    assert result['revenue']['price'] == [10.0, 20.0, 30.0]
+    assert result['big']['price'] == 20.0
+    # float() drops the duals, that formula is differenced numerically
+    assert abs(result['double']['price'] - 120.0) < 1e-6
+    assert tea.results == {}
+    assert tea.sensitivities(['profit'], inputs=['cost']) == {'profit': {'cost': -1.0}}
+
+def test_sensitivities_finance101(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    result = fin.sensitivities(['IRR', 'NPV'], inputs=['SolarCapacity'])
+    h = 1e-4
+    up = fin.copy()
+    up['SolarCapacity'] = 100 + h
+    down = fin.copy()
+    down['SolarCapacity'] = 100 - h
+    expected = (up.compute('NPV') - down.compute('NPV')) / (2 * h)
+    assert abs(result['NPV']['SolarCapacity'] - expected) < 1e-6 * abs(expected)
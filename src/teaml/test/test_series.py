@@ -0,0 +1,59 @@
+import pickle
+
+import pytest
+import teaml as tml
+from teaml.series import Series, read, write
+
+numpy = pytest.importorskip('numpy')
+
+model = '''\
+Inputs:
+  Capacity: 100
+  Hourly:
+    Irradiance: !series irradiance.npy
+    Price: !series price.f64
+Output: =Capacity * Irradiance
+Revenue: =sum(Output * Price)
+'''
+
+@pytest.fixture
+def folder(tmp_path):
+    numpy.save(tmp_path / 'irradiance.npy', numpy.linspace(0, 1, 8760))
+    write(str(tmp_path / 'price.f64'), [30.0] * 8760)
+    (tmp_path / 'model.yaml').write_text(model)
+    return tmp_path
+
+def test_series(folder):
+    tea = tml.load(str(folder / 'model.yaml'))
+    irradiance = tea.get_value('Irradiance')
+    assert isinstance(irradiance.base, numpy.memmap)
+    assert len(tea.get_value('Price')) == 8760
+    assert tea.compute('Revenue') == pytest.approx(100 * 30 * 4380)
+    assert list(tea.as_columns('Hourly')) == ['Irradiance', 'Price']
+    assert tea.copy().tree['Inputs']['Hourly']['Irradiance'] is tea.tree['Inputs']['Hourly']['Irradiance']
+    assert '!series irradiance.npy' in tea.dumps()
+    clone = pickle.loads(pickle.dumps(tea.tree))
+    assert clone['Inputs']['Hourly']['Irradiance'] == tea.tree['Inputs']['Hourly']['Irradiance']
+
+def test_save_external(folder, tmp_path):
+    tea = tml.load(str(folder / 'model.yaml'))
+    tea.compute()
+    out = tmp_path / 'out' / 'saved.yaml'
+    out.parent.mkdir()
+    tea.save(str(out), external=1000)
+    text = out.read_text()
+    assert '!series ../irradiance.npy' in text
+    assert 'path: saved.series/Output.npy' in text
+    saved = tml.load(str(out))
+    assert isinstance(saved.tree['Output'], Series)
+    assert list(saved.get_value('Output')) == list(tea.get_value('Output'))
+    assert saved.get_value('Revenue') == tea.get_value('Revenue')
+    assert saved.reset().tree['Output'] == '=Capacity*Irradiance'
+    assert saved.reset().compute('Revenue') == pytest.approx(tea.get_value('Revenue'))
+
+def test_raw_float64(tmp_path):
+    path = str(tmp_path / 'values.f64')
+    write(path, [1.5, 2.5])
+    assert list(read(path)) == [1.5, 2.5]
+    tea = tml.loads(f'x: !series {path}\ny: =x * 2')
+    assert tea.compute('y') == [3.0, 5.0]
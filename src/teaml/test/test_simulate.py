@@ -0,0 +1,42 @@
+import math
+
+import pytest
+import teaml as tml
+
+from .config import finance101yaml
+
+simulate = pytest.importorskip('teaml.simulate')
+numpy = pytest.importorskip('numpy')
+
+def test_simulate():
+    tea = tml.loads('''\
+price: 2
+volume: [10, 20, 30]
+cost: 5
+revenue: =price * volume
+profit: =sum(revenue) - cost
+capped: =IF(profit > 120, 120, profit)
+label: hello
+''')
+    distributions = {'price': simulate.Normal(2, 0.1), 'cost': simulate.Uniform(0, 10)}
+    summary = tea.simulate(distributions, ['profit', 'revenue', 'capped', 'label', 'volume'], n=20000, seed=1)
+    profit = summary['profit']
+    assert abs(profit['mean'] - 115) < 0.2
+    assert abs(profit['sd'] - math.sqrt(60 ** 2 * 0.01 + 100 / 12)) < 0.2
+    assert profit['p5'] < profit['p50'] < profit['p95']
+    assert profit['failed'] == 0
+    assert [round(v) for v in summary['revenue']['mean']] == [20, 40, 60]
+    assert summary['capped']['max'] == 120
+    assert summary['label'] == {'error': 'hello'}
+    assert summary['volume']['sd'] == [0, 0, 0]
+    assert tea.results == {}
+    assert tea.simulate(distributions, ['profit'], n=100, seed=1) == tea.simulate(distributions, ['profit'], n=100, seed=1)
+
+def test_simulate_finance101(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    base = fin.compute('IRR')
+    summary = fin.simulate({'SolarCapacityFactor': simulate.Normal(0.25, 0.02)}, ['IRR', 'NPV'], n=500, seed=0)
+    irr = summary['IRR']
+    assert irr['p10'] < base < irr['p90']
+    assert all(math.isfinite(irr[k]) for k in ('p5', 'p50', 'p95'))
+    assert summary['NPV']['p10'] < summary['NPV']['p90']
@@ -0,0 +1,35 @@
+import teaml as tml
+from teaml.solve import brent, linear_solve
+
+from .config import finance101yaml
+
+def test_brent():
+    root, iterations, converged = brent(lambda x: x ** 3 - 2, 0, 2)
+    assert converged and abs(root - 2 ** (1 / 3)) < 1e-12
+    assert linear_solve([[0, 2], [1, 1]], [4, 3]) == [1.0, 2.0]
+
+def test_goal_seek():
+    tea = tml.loads('''\
+price: 10
+volume: 100
+cost: 500
+profit: =price * volume - cost
+margin: =profit / (price * volume)
+''')
+    solution = tea.goal_seek('profit', 1000, 'price')
+    assert solution.converged
+    assert abs(solution.inputs['price'] - 15) < 1e-9
+    assert abs(solution.outputs['profit'] - 1000) < 1e-6
+    assert tea.get_value('price') == 10
+
+    solution = tea.solve({'profit': 2000, 'margin': 0.5}, ['price', 'cost'])
+    assert solution.converged
+    assert abs(solution.inputs['price'] - 40) < 1e-6
+    assert abs(solution.inputs['cost'] - 2000) < 1e-6
+
+def test_goal_seek_irr(finance101yaml):
+    fin = tml.loads(finance101yaml)
+    solution = fin.goal_seek('IRR', 0.18, 'SolarCapacity', bounds=(100, 400))
+    tea = fin.copy()
+    tea['SolarCapacity'] = solution.inputs['SolarCapacity']
+    assert abs(tea.compute('IRR') - 0.18) < 1e-9
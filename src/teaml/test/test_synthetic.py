@@ -0,0 +1,29 @@
+import json
+
+import teaml as tml
+from teaml.benchmark import main, run
+from teaml.synthetic import generate
+from teaml.teaml import walk
+
+def test_generate():
+    root = generate(nodes=300, depth=2, collisions=0.3, vector_length=4, fan_in=3, seed=1)
+    assert root == generate(nodes=300, depth=2, collisions=0.3, vector_length=4, fan_in=3, seed=1)
+    paths = [path for (data, path) in walk(root) if not isinstance(data, dict)]
+    assert len(paths) == 300
+    names = [path[-1] for path in paths]
+    assert len(set(names)) < len(names)
+    tea = tml.Teaml(root)
+    assert tea.compute() is None
+    assert all(len(v) == 4 for v in tea.results.values())
+
+def test_benchmark():
+    report = run(nodes=50, repeat=1, lookups=5)
+    assert report['params']['nodes'] == 50
+    assert set(report['results']) >= {'loads', 'find', 'compute', 'compute_key', 'trace', 'copy', 'reset', 'dumps'}
+    assert all(len(timing['runs']) == 1 for timing in report['results'].values())
+
+def test_benchmark_main(tmp_path):
+    output = tmp_path / 'bench.json'
+    main(['--nodes', '50', '--repeat', '1', '--lookups', '7', '--output', str(output)])
+    assert json.loads(output.read_text())['params']['lookups'] == 7
+
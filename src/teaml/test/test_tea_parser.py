@@ -1,7 +1,7 @@
 
 from collections import namedtuple
 
-from teaml.formula.tea_parser import computer, create_namedtuples, filter_bases
+from teaml.formula.tea_parser import computer, create_namedtuples, filter_bases, FormulaCache, Parser
 from teaml.utils import munge
 
 Row = namedtuple('Test', ['input', 'expected'])
@@ -29,6 +29,14 @@ def test_fakenames():
     assert context['a'].b.c == 50
     assert context['a'].b.z == 4
 
+def test_fakenames_shape_reused():
+    first = create_namedtuples({'x': 1, 'a.b.c': 50, 'a.d': 4})
+    second = create_namedtuples({'x': 2, 'a.b.c': 60, 'a.d': 5})
+    assert type(first['a']) is type(second['a'])
+    assert first['a']._fields == ('d', 'b')
+    assert second == {'x': 2, 'a': second['a']}
+    assert (second['a'].b.c, second['a'].d) == (60, 5)
+
 def test_filter_bases():
     context = {'a.b.c': 50, 'a.b.z': 4, 'a':None}
     context = filter_bases(context)
@@ -98,3 +106,22 @@ def test_evals():
     for test in eval_tests:
         result = computer.compute(test.input, eval_symbols)
         assert result == test.expected, f"Test: {test.input} Expected {test.expected} got: {result}"
+
+def test_parse_cache():
+    first = computer.parse('Solar Capacity*Solar Capacity Factor')
+    assert computer.parse('SolarCapacity*SolarCapacityFactor') is first
+    assert first.names == ['SolarCapacity', 'SolarCapacityFactor']
+    first.names.append('mutated')
+    assert first.names == ['SolarCapacity', 'SolarCapacityFactor']
+    assert eval(first.code, {}, {'SolarCapacity': 2, 'SolarCapacityFactor': 3}) == 6
+
+def test_formula_cache_bounded():
+    cache = FormulaCache(maxsize=2)
+    for source in ['a', 'b', 'a', 'c']:
+        cache.get(source, lambda s: Parser(s, sandbox={}))
+    assert list(cache.entries) == ['a', 'c']
+    assert (cache.hits, cache.misses) == (1, 3)
+
+def test_compute_syntax_error():
+    assert computer.compute('1+', {}).startswith('#error(')
+    assert computer.compute('1+', {}).startswith('#error(')
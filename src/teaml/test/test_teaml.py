@@ -1,6 +1,8 @@
+import pytest
 import yaml
 
 import teaml as tml
+from teaml.utils import munge
 
 def tea1():
     return tml.loads('''\
@@ -52,3 +54,146 @@ def test_key_error():
     tea = computed1()
     assert tea['bad_ref'].value == '#error(Key:missing)'
     assert tea['ambiguous_ref'].value == '#error(Ambigous:cap matches outer.inputs.mixed level.capacity, outer.inputs.mixed level.capacity value, outer.outputs.capacity)'
+
+def test_copy_on_write():
+    tea = computed1()
+    copy = tea.copy()
+    assert copy.tree is tea.tree
+    copy['capacity value'] = 150
+    assert tea['capacity value'].value == 100
+    assert copy['capacity value'].value == 150
+    # only containers along the written path are copied
+    assert copy.tree['outer']['outputs'] is tea.tree['outer']['outputs']
+    assert copy.tree['outer']['inputs'] is not tea.tree['outer']['inputs']
+    copy['total'] = '=mixed.capacity + mixed.capacity value'
+    assert copy.compute('total') == 450
+    assert tea['total'].value == 400
+    tea['outputs.capacity'] = 1
+    assert copy['outputs.capacity'].value == 200
+    assert tea.dumps() != copy.dumps()
+
+def test_copy_results():
+    from teaml.results import Results
+    tea = computed1()
+    total = tea.results[('outer', 'outputs', 'total')]
+    copy = tea.copy()
+    # Both share the computed results and write to their own front dict
+    assert copy.results.maps[0] == {} and tea.results.maps[0] == {}
+    assert copy.results.maps[1] is tea.results.maps[1]
+    copy['capacity value'] = 150
+    assert copy.compute('total') == 450
+    assert copy.results.maps[0] == {('outer', 'outputs', 'total'): 450}
+    assert tea.results[('outer', 'outputs', 'total')] == total == 400
+    # Removing a result hides the shared one
+    copy['total'] = '=mixed.capacity * 2'
+    assert ('outer', 'outputs', 'total') not in copy.results
+    assert ('outer', 'outputs', 'total') in tea.results
+    copy['total'] = '=mixed.capacity + mixed.capacity value'
+    # Copies of copies stay a few layers deep
+    for _ in range(20):
+        copy = copy.copy()
+        copy['capacity value'] = 160
+        copy.compute('total')
+    assert len(copy.results.maps) <= Results.MAX_LAYERS + 1
+    assert copy.get_value('total') == 460
+    assert dict(copy.results) == {path: copy.results[path] for path in copy.results}
+
+def test_batch_restores_formulas():
+    tea = tml.Teaml({'M': {'A': 1, 'F': '=A*10', 'G': '=F+1'}})
+    overrides = [{'A': 5}, {'F': 100}, {}, {'F': 7, 'A': 2}, {'A': 3}]
+    assert tea.batch(overrides, ['F', 'G']) == [
+        {'F': 50, 'G': 51},
+        {'F': 100, 'G': 101},
+        {'F': 10, 'G': 11},
+        {'F': 7, 'G': 8},
+        {'F': 30, 'G': 31}]
+    assert tea.sweep({'F': [100]}, outputs=['G'])['G'] == [101]
+    tea['F'] = '=A*20'
+    assert tea.get_value('F') == 20
+
+def test_reset():
+    tea = computed1()
+    fresh = tea.reset()
+    assert fresh['total'].is_none
+    assert tea['total'].value == 400
+
+def test_native_results():
+    tea = tml.loads('''\
+values:
+  third: =1/3
+  flag: =third < 1
+  series: =range(1, 4)
+  scaled: =series * third
+''')
+    tea.compute()
+    assert tea.get_value('flag') is True
+    assert tea.get_value('scaled') == [1/3, 2/3, 1.0]
+    assert tea['scaled'].value == [1/3, 2/3, 1.0]
+    assert tea['scaled'].formula == '=series*third'
+    assert tea.raw('flag') == '=third<1 =True'
+    assert tea.tree['values']['third'] == '=1/3'
+    assert yaml.safe_load(tea.dumps())['values']['scaled'] == f'=series*third ={[1/3, 2/3, 1.0]}'
+
+def test_load_cache(tmp_path):
+    from teaml.formula.tea_parser import computer
+    model = tmp_path / 'model.yaml'
+    model.write_text("a: 2\nb: =a * 3\nc:\n  d: =b + x\n  cap one: 1\n  cap two: 2\n  e: =cap\n", encoding='utf-8')
+    cache = tmp_path / 'cache'
+    first = tml.load(model, cache=cache)
+    assert len(list(cache.iterdir())) == 1
+    computer.cache.clear()
+    second = tml.load(model, cache=cache)
+    assert second.tree == first.tree
+    assert second._graph is not None and len(computer.cache) == 3
+    second.compute()
+    assert second.get_value('b') == 6
+    assert second.get_value('d') == '#error(Key:x)'
+    assert second.get_value('e').startswith('#error(Ambigous:cap matches')
+    model.write_text("a: 3\nb: =a * 3\n", encoding='utf-8')
+    assert tml.load(model, cache=cache).compute('b') == 9
+    assert len(list(cache.iterdir())) == 2
+
+def test_load_cache_syntax_error(tmp_path):
+    model = tmp_path / 'model.yaml'
+    model.write_text("a: 2\nx: =1 +\ny: =a * 3\n", encoding='utf-8')
+    cache = tmp_path / 'cache'
+    for tea in (tml.load(model), tml.load(model, cache=cache), tml.load(model, cache=cache)):
+        assert tea.compute('y') == 6
+        with pytest.raises(SyntaxError):
+            tea.compute()
+
+def test_profile():
+    from teaml.profiling import ComputeHook
+    class Recorder(ComputeHook):
+        def __init__(self):
+            self.paths = []
+        def before(self, tea, path):
+            self.paths.append(path)
+
+    tea = tea1()
+    recorder = Recorder()
+    tea.hooks.append(recorder)
+    report = tea.compute(profile=True)
+    assert tea.hooks == [recorder]
+    assert sorted(recorder.paths) == sorted(tea.graph.formulas)
+    rows = {row.key: row for row in report}
+    assert set(rows) == {munge(list(path)) for path in tea.graph.formulas}
+    assert rows['outer.outputs.total'].evaluations == 1
+    assert rows['outer.outputs.total'].size == 1
+    assert rows['outer.outputs.total'].error is None
+    assert rows['outer.outputs.bad_ref'].error == '#error(Key:missing)'
+    assert report == sorted(report, key=lambda row: row.compute, reverse=True)
+
+    with tea.profile() as profiler:
+        tea['capacity value'] = 50
+        tea.get_value('broken')
+    assert [row.key for row in profiler.report(sort='key')] == ['outer.outputs.broken', 'outer.outputs.total']
+
+def test_write_back_range():
+    tea = tml.loads('v: [1, 2, 3]\nw: =v * 2.5\nz: 0\nu: =z * 2\ngrp: {r: 0}\n')
+    tea.compute()
+    tea['z'] = tea.get_value('w')
+    tea['grp'] = {'r': tea.get_value('w')}
+    assert type(tea.tree['z']) is list and type(tea.tree['grp']['r']) is list
+    assert tea.compute('u') == [5.0, 10.0, 15.0]
+    assert yaml.safe_load(tea.dumps())['z'] == [2.5, 5.0, 7.5]
@@ -0,0 +1,38 @@
+import pytest
+import teaml as tml
+from teaml.validation import Problem, ValidationError
+
+from .config import finance101yaml
+
+def test_validate():
+    tea = tml.loads('''\
+x: =1 +
+y: =x * 2
+a: =b
+b: =a
+c: =Missing + y
+g1: {v: 1}
+g2: {v: 2}
+d: =v
+''')
+    problems = tea.validate()
+    assert [(p.key, p.kind, p.reference) for p in problems] == [
+        ('x', 'syntax', None),
+        ('c', 'missing', 'Missing'),
+        ('d', 'ambiguous', 'v'),
+        ('a', 'cycle', None),
+    ]
+    assert problems[2].detail == 'matches g1.v, g2.v'
+    assert problems[3].detail == 'a -> b'
+
+def test_loads_validate(finance101yaml):
+    with pytest.raises(ValidationError) as e:
+        tml.loads(finance101yaml, validate=True)
+    assert Problem('Finance101.Annual.TaxCalculation.TaxableIncome(Loss)', 'missing', 'EBIDTA', 'not found') in e.value.problems
+    assert str(e.value).startswith('3 problems\n')
+
+    tea = tml.loads('price: 2\nvolume: [1, 2]\nrevenue: =price * volume\n', validate=True)
+    graph = tea.graph
+    assert graph.find is None
+    assert dict.get(graph.bindings, ('revenue',)) == {'price': ('price',), 'volume': ('volume',)}
+    assert tea.compute('revenue') == [2, 4]
@@ -1,4 +1,5 @@
 from teaml.formula.vector import Vector
+from .config import finance101yaml
 
 def test_pow():
     v = Vector([1, 2, 3])
@@ -45,3 +46,78 @@ def test_multi():
 def test_negative():
     a = Vector([1, 2, 3])
     assert -a == [-1, -2, -3]
+
+def test_array_vector():
+    from teaml.formula.vector import ArrayVector, vector
+    if ArrayVector is None:
+        return
+    a = vector([1, 2, 4])
+    b = vector([4.0, 2.0, 1.0])
+    assert isinstance(a, ArrayVector)
+    assert isinstance(vector([1, 2.5]), Vector)
+    assert a * b == Vector([1, 2, 4]) * Vector([4.0, 2.0, 1.0])
+    assert 1 / a == [1.0, 0.5, 0.25]
+    assert 2 - a == [1, 0, -2]
+    assert a ** 2 == [1, 4, 16]
+    assert a + Vector([1, 2.5, 0]) == [2, 4.5, 4]
+    assert Vector([1, 2.5, 0]) + a == [2, 4.5, 4]
+    assert list(a) == [1, 2, 4] and type(a[0]) is int
+    assert str(-a) == '[-1, -2, -4]'
+    assert a * 'x' is None
+
+def test_vector_without_numpy(finance101yaml, monkeypatch):
+    import teaml as tml
+    from teaml.formula import vector
+    fin = tml.loads(finance101yaml)
+    fin.compute()
+    monkeypatch.setattr(vector, 'numpy', None)
+    plain = tml.loads(finance101yaml)
+    plain.compute()
+    assert plain.dumps() == fin.dumps()
+
+def test_array_vector_parity():
+    import operator
+    from teaml.formula.vector import ArrayVector, vector
+    if ArrayVector is None:
+        return
+
+    def outcome(operation, *args):
+        try:
+            result = operation(*args)
+        except Exception as e:
+            return type(e), str(e)
+        return type(result) in (int, float), repr(result)
+
+    binary = [operator.add, operator.sub, operator.mul, operator.truediv, operator.pow,
+        operator.mod, operator.floordiv, operator.matmul, operator.and_, operator.lshift, divmod]
+    unary = [operator.neg, operator.pos, abs, operator.invert, float, int, operator.index, round]
+    ranges = [[1, 2, 4], [0.5, -2.0, 4.0], [2 ** 40, -3, 2 ** 53 + 1], [-2 ** 63, 1, 2], [0, 1, 2]]
+    numbers = [2, -1.5, 0, 2 ** 62, 2 ** 70]
+    def small(value):
+        return all(abs(v) < 100 for v in (value if isinstance(value, list) else [value]))
+
+    for values in ranges:
+        array, plain = vector(values), Vector(values)
+        assert isinstance(array, ArrayVector)
+        for operation in unary:
+            assert outcome(operation, array) == outcome(operation, plain), (operation, values)
+        for other in numbers + [vector(v) for v in ranges] + [Vector(v) for v in ranges]:
+            plain_other = Vector(other) if isinstance(other, ArrayVector) else other
+            for operation in binary:
+                if operation is operator.pow and not (small(values) and small(plain_other)):
+                    # Exact big int powers take forever
+                    continue
+                assert outcome(operation, array, other) == outcome(operation, plain, plain_other), (operation, values, other)
+                assert outcome(operation, other, array) == outcome(operation, plain_other, plain), (operation, other, values)
+        assert array.index(values[1]) == plain.index(values[1])
+        assert array.count(values[0]) == plain.count(values[0])
+
+def test_array_vector_overflow():
+    from teaml.formula.vector import ArrayVector, vector
+    if ArrayVector is None:
+        return
+    a = vector([1, 2, 4])
+    assert a * 2 ** 62 == [2 ** 62, 2 ** 63, 2 ** 64]
+    assert a + (2 ** 63 - 2) == [2 ** 63 - 1, 2 ** 63, 2 ** 63 + 2]
+    assert -vector([-2 ** 63, 1]) == [2 ** 63, -1]
+    assert isinstance(a * 3, ArrayVector)
@@ -0,0 +1,65 @@
+"""
+Checking a model's formulas before computing it
+
+Every formula's references are resolved in one pass over the name index,
+and the resulting bindings stay in the dependency graph for `compute`.
+"""
+
+from collections import namedtuple
+
+from teaml.container import AmbigousNameError
+from teaml.graph import strongly_connected
+from teaml.utils import munge
+
+Problem = namedtuple('Problem', ['key', 'kind', 'reference', 'detail'])
+Problem.__doc__ = """
+Something that stops a formula computing
+
+`kind` is 'syntax', 'missing', 'ambiguous' or 'cycle'. `reference` is the
+name as written in the formula, None for syntax errors and cycles.
+"""
+
+class ValidationError(ValueError):
+    """
+    Raised by `loads(..., validate=True)` with every Problem found
+    """
+    def __init__(self, problems):
+        self.problems = problems
+        lines = [f"{p.key}: " + ' '.join(str(part) for part in p[1:] if part) for p in problems]
+        super().__init__(f"{len(problems)} problems\n" + '\n'.join(lines))
+
+    def __reduce__(self):
+        return (ValidationError, (self.problems,))
+
+def validate(tea):
+    """
+    Resolves every formula of `tea`, reporting what can't be computed
+
+    Returns:
+        list: Problems in model order, cycles last
+    """
+    graph = tea.graph
+    problems = []
+    parsed = []
+    for path in graph.formulas:
+        key = munge('.'.join(path))
+        try:
+            bindings = graph.bindings[path]
+        except (SyntaxError, ValueError) as e:
+            problems.append(Problem(key, 'syntax', None, getattr(e, 'msg', None) or str(e)))
+            continue
+        parsed.append(path)
+        for name, ref in bindings.items():
+            if isinstance(ref, AmbigousNameError):
+                matches = ', '.join('.'.join(p) for p in ref.paths)
+                problems.append(Problem(key, 'ambiguous', name, f'matches {matches}'))
+            elif isinstance(ref, KeyError):
+                problems.append(Problem(key, 'missing', name, 'not found'))
+    # Formulas that don't parse have no dependencies to follow
+    dependencies = {path: graph.dependencies[path] for path in parsed}
+    for cycle in strongly_connected(list(graph.formulas), dependencies).cycles:
+        keys = [munge('.'.join(path)) for path in cycle]
+        problems.append(Problem(keys[0], 'cycle', None, ' -> '.join(keys)))
+    if len(parsed) == len(graph.formulas):
+        graph.resolve_all()
+    return problems